@@ -0,0 +1,381 @@
+"""
+Benchmarks of the giganten simulation.
+
+Each benchmark is run --warmup times unmeasured and then --repeat times. One
+repetition is:
+
+    dijkstra     a search, with each implementation in giganten.SEARCHES,
+                 from each truck with its action card's movement, in every
+                 position of a reference game
+    choose_goal  choose_goal() for each truck in the same positions
+    one_turn     a game played one turn at a time, each turn timed
+    play_game    PLAY_GAMES games, each timed
+    batch        --games games in a row, timed together
+
+The seeds are fixed: the reference game and the games of repetition n are
+seeded with giganten.game_seed() from --seed, so every run plays the same
+games. The samples of each benchmark are summarized by the median and
+percentiles of the time per operation, and by the throughput: the operations
+per second over all the samples.
+
+--scale runs the benchmarks again on boards made by tiling the board the
+given number of times across and down (see scale_board()). --synthetic
+runs them on boards of the given sizes from board_generator.py, generated
+with --seed.
+
+--memory keeps --games games alive at once, each with its own Graph sharing
+one Topology, as a tournament worker or a search tree would, and reports the
+memory allocated per game when the games are created and after they have
+been played to the end. The memory is measured with tracemalloc, so it
+counts only Python allocations, not the interpreter and modules.
+
+--json writes the results, with the settings and the Python version, to a
+file to compare between releases.
+"""
+import argparse
+import datetime
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from board_generator import generate_board
+import giganten
+from graph import Graph
+
+BENCHMARKS = ('dijkstra', 'choose_goal', 'one_turn', 'play_game', 'batch')
+PLAY_GAMES = 20  # the games in one repetition of play_game
+
+
+def setup(args, rawboard=None):
+    """
+    Set the giganten module globals as if it had been run with the board
+    and options given to this program.
+    @param args: the arguments of this program
+    @param rawboard: the board to play on instead of the one in args.incsv
+    @return: the board
+    """
+    gargs = giganten.getargs([args.incsv, '-n', str(args.nplayers),
+                              '--search', args.search,
+                              '--seed', str(args.seed), '-v', '0'])
+    giganten._args = gargs
+    if rawboard is None:
+        rawboard = giganten.read_board(gargs.incsv)
+    gargs.incsv.close()
+    giganten.init_worker(gargs, rawboard, args.seed)
+    return rawboard
+
+
+def scale_board(rawboard, scale):
+    """
+    @param rawboard: the list of rows returned by giganten.read_board()
+    @param scale: the number of copies across and down
+    @return: the board tiled scale times in both directions. The copies are
+             separated by a row or column of flat cells, so that no two
+             cells with wells are next to each other.
+    """
+    rows = [(list(row) + ['1']) * scale for row in rawboard]
+    separator = ['1'] * len(rows[0])
+    board = (rows + [separator]) * scale
+    return [row[:-1] for row in board[:-1]]
+
+
+def summarize(samples, ops=1):
+    """
+    @param samples: the times in nanoseconds
+    @param ops: the number of operations timed by each sample
+    @return: a dict of the statistics of the time per operation in
+             microseconds and the operations per second
+    """
+    times = [t / ops / 1000 for t in samples]
+    if len(times) > 1:
+        cuts = statistics.quantiles(times, n=100, method='inclusive')
+    else:
+        cuts = times * 99
+    return {'samples': len(times),
+            'min_us': min(times),
+            'p10_us': cuts[9],
+            'median_us': statistics.median(times),
+            'p90_us': cuts[89],
+            'p99_us': cuts[98],
+            'max_us': max(times),
+            'per_second': len(samples) * ops * 1e9 / sum(samples)}
+
+
+def reference_positions():
+    """
+    Play the reference game, the game numbered -1, and snapshot it after
+    each turn.
+    @return: the game and the list of snapshots
+    """
+    game = giganten.new_game(-1)
+    positions = []
+    nplayers = game.nplayers
+    turn = 0
+    while True:
+        turn += 1
+        for starting in range(nplayers):
+            playerlist = game.players[starting:] + game.players[:starting]
+            if giganten.one_turn(turn, playerlist, game):
+                return game, positions
+            positions.append(game.snapshot())
+
+
+def run(benchmark, repeat, warmup):
+    """
+    @param benchmark: a function of no arguments returning a list of times
+                      in nanoseconds
+    @return: the times of the measured repetitions
+    """
+    for _ in range(warmup):
+        benchmark()
+    samples = []
+    for _ in range(repeat):
+        samples.extend(benchmark())
+    return samples
+
+
+def bench_dijkstra(game, positions, search):
+    def benchmark():
+        times = []
+        graph = game.graph
+        for position in positions:
+            game.restore(position)
+            for player in game.players:
+                root = player.truck_node
+                maxcost = player.actions.movement
+                t0 = time.perf_counter_ns()
+                search(graph, root, maxcost, verbose=0)
+                times.append(time.perf_counter_ns() - t0)
+        return times
+    return benchmark
+
+
+def bench_choose_goal(game, positions):
+    def benchmark():
+        times = []
+        for position in positions:
+            game.restore(position)
+            for player in game.players:
+                t0 = time.perf_counter_ns()
+                giganten.choose_goal(player, game.graph)
+                times.append(time.perf_counter_ns() - t0)
+        return times
+    return benchmark
+
+
+def bench_one_turn():
+    ngames = iter(range(sys.maxsize))
+
+    def benchmark():
+        times = []
+        game = giganten.new_game(next(ngames))
+        nplayers = game.nplayers
+        turn = 0
+        game_ended = False
+        while not game_ended:
+            turn += 1
+            for starting in range(nplayers):
+                playerlist = game.players[starting:] + game.players[:starting]
+                t0 = time.perf_counter_ns()
+                game_ended = giganten.one_turn(turn, playerlist, game)
+                times.append(time.perf_counter_ns() - t0)
+                if game_ended:
+                    break
+        return times
+    return benchmark
+
+
+def bench_play_game():
+    ngames = iter(range(sys.maxsize))
+
+    def benchmark():
+        times = []
+        for _ in range(PLAY_GAMES):
+            game = giganten.new_game(next(ngames))
+            t0 = time.perf_counter_ns()
+            giganten.play_game(game)
+            times.append(time.perf_counter_ns() - t0)
+        return times
+    return benchmark
+
+
+def bench_batch(ngames):
+    def benchmark():
+        t0 = time.perf_counter_ns()
+        for ngame in range(ngames):
+            giganten.play_game(giganten.new_game(ngame))
+        return [time.perf_counter_ns() - t0]
+    return benchmark
+
+
+def run_benchmarks(args, board, scale):
+    """
+    @param args: the arguments of this program
+    @param board: the name of the board set up by setup()
+    @param scale: the board's scale, or 1 if it isn't tiled
+    @return: a list of a result dict for each benchmark run on the board
+    """
+    graph = giganten.pooled_graph(args.nplayers)
+    common = {'board': board, 'scale': scale,
+              'nodes': len(graph.graph)}
+    results = []
+
+    def report(name, unit, samples, ops=1, **extra):
+        result = {'benchmark': name, 'unit': unit, **extra, **common,
+                  **summarize(samples, ops)}
+        results.append(result)
+        print(f'{name:<20} {board:<24} {scale:>5} {result["samples"]:>8} '
+              f'{result["median_us"]:>12.1f} {result["p90_us"]:>12.1f} '
+              f'{result["p99_us"]:>12.1f} {result["per_second"]:>12.1f} '
+              f'{unit}/s')
+
+    repeat, warmup = args.repeat, args.warmup
+    if {'dijkstra', 'choose_goal'} & set(args.bench):
+        # The reference game has its own Graph; new_game() reuses the pooled
+        # one.
+        game, positions = reference_positions()
+        giganten._graphs.clear()
+        if 'dijkstra' in args.bench:
+            for name, search in giganten.SEARCHES.items():
+                samples = run(bench_dijkstra(game, positions, search),
+                              repeat, warmup)
+                report(f'dijkstra[{name}]', 'search', samples,
+                       search=name)
+        if 'choose_goal' in args.bench:
+            samples = run(bench_choose_goal(game, positions), repeat,
+                          warmup)
+            report('choose_goal', 'call', samples, search=args.search)
+    if 'one_turn' in args.bench:
+        samples = run(bench_one_turn(), repeat, warmup)
+        report('one_turn', 'turn', samples, search=args.search)
+    if 'play_game' in args.bench:
+        samples = run(bench_play_game(), repeat, warmup)
+        report('play_game', 'game', samples, search=args.search)
+    if 'batch' in args.bench:
+        samples = run(bench_batch(args.games), repeat, 0)
+        report('batch', 'game', samples, ops=args.games,
+               search=args.search, games=args.games)
+    return results
+
+
+def memory_per_game(rawboard, ngames, nplayers):
+    """
+    @param rawboard: the board
+    @param ngames: the number of games to keep alive
+    @param nplayers: the number of players
+    @return: the bytes per game after the games are created and after they
+             are played, and the bytes of the shared Topology
+    """
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    topology = Graph(rawboard, nplayers).topology
+    gc.collect()  # the Graph and its Nodes refer to each other
+    shared = tracemalloc.get_traced_memory()[0] - base
+    base += shared
+    games = []
+    for ngame in range(ngames):
+        random.seed(giganten.game_seed(ngame))
+        games.append(giganten.Game(Graph(topology, nplayers), nplayers))
+    created = tracemalloc.get_traced_memory()[0] - base
+    for ngame, game in enumerate(games):
+        random.seed(giganten.game_seed(ngame))
+        giganten.play_game(game)
+    gc.collect()
+    played = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return created / ngames, played / ngames, shared
+
+
+def main():
+    rawboard = setup(_args)
+    results = []
+    if _args.bench:
+        print(f'{"benchmark":<20} {"board":<24} {"scale":>5} {"samples":>8} '
+              f'{"median us":>12} {"p90 us":>12} {"p99 us":>12} '
+              f'{"throughput":>12}')
+    for scale in _args.scale:
+        if _args.bench:
+            setup(_args, scale_board(rawboard, scale))
+            results.extend(run_benchmarks(_args, _args.incsv, scale))
+    for size in _args.synthetic:
+        rows, columns = map(int, size.split('x'))
+        setup(_args, generate_board(rows, columns, _args.seed))
+        results.extend(run_benchmarks(
+            _args, f'synthetic {size} seed {_args.seed}', 1))
+    if _args.memory:
+        setup(_args, rawboard)
+        created, played, shared = memory_per_game(rawboard, _args.games,
+                                                  _args.nplayers)
+        results.append({'benchmark': 'memory', 'board': _args.incsv,
+                        'games': _args.games, 'created_bytes': created,
+                        'played_bytes': played, 'shared_bytes': shared})
+        print(f'memory: {_args.games} live games, {created:,.0f} bytes per '
+              f'game created, {played:,.0f} bytes per game played, '
+              f'{shared:,.0f} bytes shared')
+    if _args.json:
+        with open(_args.json, 'w') as f:
+            json.dump({'time': datetime.datetime.now().isoformat(
+                           timespec='seconds'),
+                       'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'seed': _args.seed,
+                       'nplayers': _args.nplayers,
+                       'repeat': _args.repeat,
+                       'warmup': _args.warmup,
+                       'results': results}, f, indent=2)
+            f.write('\n')
+
+
+def getargs():
+    parser = argparse.ArgumentParser(description='''
+        Benchmark the giganten simulation.
+        ''')
+    parser.add_argument('incsv', help='''
+    The file containing the board description.''')
+    parser.add_argument('-b', '--bench', nargs='*', choices=BENCHMARKS,
+                        default=list(BENCHMARKS), help='''
+    The benchmarks to run. The default is all of them. Give the option with
+    no benchmarks to run only --memory.''')
+    parser.add_argument('-g', '--games', type=int, default=1000, help='''
+    The number of games in the batch benchmark and the number of live games
+    for --memory. The default is 1000.''')
+    parser.add_argument('--json', help='''
+    The file to write the results to as JSON.''')
+    parser.add_argument('--memory', action='store_true', help='''
+    Report the memory per live game.''')
+    parser.add_argument('-n', '--nplayers', type=int, default=4, help='''
+    The number of players. The default is 4.''')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='''
+    The number of measured repetitions of each benchmark. The default is
+    5.''')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1], help='''
+    Run the benchmarks on the board tiled this many times across and down.
+    Several scales can be given. The default is 1, the board as it is.''')
+    parser.add_argument('--search', choices=giganten.SEARCHES,
+                        default='heap', help='''
+    The search used by choose_goal and the games. The dijkstra benchmark
+    runs all of them. The default is heap.''')
+    parser.add_argument('--seed', type=int, default=1, help='''
+    The base seed of the games. The default is 1.''')
+    parser.add_argument('--synthetic', nargs='+', default=[],
+                        metavar='ROWSxCOLUMNS', help='''
+    Also run the benchmarks on boards of these sizes made by
+    board_generator.generate_board() with --seed.''')
+    parser.add_argument('-w', '--warmup', type=int, default=1, help='''
+    The number of unmeasured repetitions before the measured ones. The
+    default is 1.''')
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == '__main__':
+    assert sys.version_info >= (3, 11)
+    if len(sys.argv) == 1:
+        sys.argv.append('-h')
+    _args = getargs()
+    main()
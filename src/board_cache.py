@@ -0,0 +1,185 @@
+"""
+A compiled copy of a board CSV file, so that the board doesn't need to be
+tokenized and parsed every time it is used.
+
+The copy is written next to the CSV file with the extension .bgb added. It is
+used only if the CSV file and the --bycols setting match those recorded when
+it was written; otherwise it is rewritten. It is opened with a memory map so
+that loading it costs almost nothing however big the board is.
+
+To keep that cheap, the CSV file is first checked by its size and
+modification time. Only if either has changed, or with verify (giganten
+--verifycache), is the CSV file read and its SHA-256 compared with the one
+recorded. If the digest still matches, say the file was touched but not
+changed, the copy is used and its recorded size and time are brought up to
+date.
+
+The layout, all little-endian, is:
+
+    magic       4 bytes  b'BGB2'
+    flags       uint32   FLAG_BYCOLS if the CSV file was read by columns
+    rows        uint32
+    columns     uint32
+    nadj        uint32   the length of adj_index
+    size        uint64   the size of the CSV file in bytes
+    mtime_ns    uint64   the st_mtime_ns of the CSV file
+    sha256      32 bytes the digest of the CSV file
+    terrain     uint8 * rows * columns
+    wells       uint8 * rows * columns
+    variant     uint8 * rows * columns
+    padding     to a multiple of 4 bytes
+    adj_start   uint32 * (rows * columns + 1)
+    adj_index   uint32 * nadj
+
+The fields are as described in graph.ParsedBoard.
+"""
+import hashlib
+import mmap
+import os.path
+import struct
+import sys
+from array import array
+
+from graph import parse_board
+
+MAGIC = b'BGB2'
+FLAG_BYCOLS = 1
+HEADER = struct.Struct('<4sIIIIQQ32s')
+# The offset of the size and mtime_ns fields, rewritten by touch_compiled()
+STAT_OFFSET = 20
+STAT = struct.Struct('<QQ')
+EXTENSION = '.bgb'
+
+
+class CompiledBoard:
+    """
+    A board loaded from a compiled copy. It has the same fields as a
+    graph.ParsedBoard (cells is None) and can be passed to Graph(). The
+    sequences are memoryviews of the memory-mapped file. When pickled, for
+    example to send it to a worker process, only the file name is sent and
+    the copy is mapped again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        (magic, self.flags, self.rows, self.columns, nadj, self.size,
+         self.mtime_ns, self.digest) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a compiled board.')
+        nnodes = self.rows * self.columns
+        offset = HEADER.size
+        self.terrain = view[offset:offset + nnodes]
+        offset += nnodes
+        self.wells = view[offset:offset + nnodes]
+        offset += nnodes
+        self.variant = view[offset:offset + nnodes]
+        offset = _aligned(offset + nnodes)
+        self.adj_start = view[offset:offset + 4 * (nnodes + 1)].cast('I')
+        offset += 4 * (nnodes + 1)
+        self.adj_index = view[offset:offset + 4 * nadj].cast('I')
+        self.cells = None
+
+    def __reduce__(self):
+        return CompiledBoard, (self.path,)
+
+
+def _aligned(offset):
+    return (offset + 3) & ~3
+
+
+def cache_path(csvpath):
+    return csvpath + EXTENSION
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def write_compiled(path, parsed, stat, digest, bycols):
+    """
+    Write a parsed board in the layout described above.
+    @param path: the file to write
+    @param parsed: a graph.ParsedBoard
+    @param stat: the os.stat_result of the CSV file
+    @param digest: the SHA-256 digest of the CSV file
+    @param bycols: True if the CSV file was read by columns
+    @return: None
+    """
+    nnodes = parsed.rows * parsed.columns
+    adj_start = array('I', parsed.adj_start)
+    adj_index = array('I', parsed.adj_index)
+    if sys.byteorder != 'little':
+        adj_start.byteswap()
+        adj_index.byteswap()
+    offset = HEADER.size + 3 * nnodes
+    # Write to a temporary file and rename it so that a reader never sees a
+    # partly written file.
+    tmppath = f'{path}.{os.getpid()}.tmp'
+    with open(tmppath, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FLAG_BYCOLS if bycols else 0,
+                            parsed.rows, parsed.columns, len(adj_index),
+                            stat.st_size, stat.st_mtime_ns, digest))
+        f.write(bytes(parsed.terrain))
+        f.write(bytes(parsed.wells))
+        f.write(bytes(parsed.variant))
+        f.write(bytes(_aligned(offset) - offset))
+        f.write(adj_start.tobytes())
+        f.write(adj_index.tobytes())
+    os.replace(tmppath, path)
+
+
+def touch_compiled(path, stat):
+    """
+    Record a new size and modification time of the CSV file in the header of
+    the compiled copy, whose digest has been found to match.
+    @return: None
+    """
+    with open(path, 'r+b') as f:
+        f.seek(STAT_OFFSET)
+        f.write(STAT.pack(stat.st_size, stat.st_mtime_ns))
+
+
+def load_board(csvpath, bycols, read_board, verify=False):
+    """
+    Load a board from its compiled copy, compiling it first if the copy is
+    missing or out of date.
+    @param csvpath: the name of the board CSV file
+    @param bycols: True if the CSV file is by columns (--bycols)
+    @param read_board: giganten.read_board, called with the open CSV file if
+                       the board must be compiled
+    @param verify: True to compare the SHA-256 of the CSV file even if its
+                   size and modification time match
+    @return: a CompiledBoard
+    """
+    stat = os.stat(csvpath)
+    path = cache_path(csvpath)
+    flags = FLAG_BYCOLS if bycols else 0
+    digest = None
+    if os.path.exists(path):
+        try:
+            compiled = CompiledBoard(path)
+        except (ValueError, TypeError, struct.error):
+            pass  # not a compiled board or truncated; rewrite it
+        else:
+            if compiled.flags == flags:
+                same_stat = (compiled.size == stat.st_size
+                             and compiled.mtime_ns == stat.st_mtime_ns)
+                if same_stat and not verify:
+                    return compiled
+                digest = file_digest(csvpath)
+                if compiled.digest == digest:
+                    if not same_stat:
+                        touch_compiled(path, stat)
+                        compiled.size = stat.st_size
+                        compiled.mtime_ns = stat.st_mtime_ns
+                    return compiled
+    if digest is None:
+        digest = file_digest(csvpath)
+    with open(csvpath) as csvfile:
+        parsed = parse_board(read_board(csvfile))
+    write_compiled(path, parsed, stat, digest, bycols)
+    return CompiledBoard(path)
@@ -0,0 +1,141 @@
+"""
+Generate random boards for scaling studies, written in the cell grammar
+read by giganten.read_board().
+
+A board is made in two passes with a random.Random seeded by --seed, so the
+same arguments always give the same board:
+
+1. Each cell gets a terrain of 1, 2 or 3 (flat, hilly or mountain) drawn
+   with the --terrain weights.
+2. The cells are visited in a random order and given wells until --wells of
+   them have wells. A cell is skipped if a neighbor already has wells, since
+   Node.add_derrick assumes that no two cells with wells are adjacent, or if
+   it is in the first column, where the trucks start. The number of wells,
+   1, 2 or 3, is drawn with the --wellcounts weights, and --xcells of the
+   cells with wells are marked "x", to be ignored in 3-player games.
+
+The defaults are the proportions of data/rawboard.csv. If the wells are too
+dense to place without neighbors, fewer are placed.
+"""
+import argparse
+import random
+import sys
+
+from graph import VARIANT_X, NO_VARIANT, format_cell, grid_adjacency
+
+DEFAULT_TERRAIN = (76, 10, 14)  # percent flat, hilly, mountain
+DEFAULT_WELLS = 0.15  # the fraction of the cells with wells
+DEFAULT_WELLCOUNTS = (1, 1, 1)  # the weights of 1, 2 and 3 wells
+DEFAULT_XCELLS = 0.17  # the fraction of the cells with wells marked "x"
+
+
+def generate_board(rows, columns, seed, terrain=DEFAULT_TERRAIN,
+                   wells=DEFAULT_WELLS, wellcounts=DEFAULT_WELLCOUNTS,
+                   xcells=DEFAULT_XCELLS):
+    """
+    @param rows:
+    @param columns:
+    @param seed: the seed of the board's random number generator
+    @param terrain: the weights of terrain 1, 2 and 3
+    @param wells: the fraction of the cells to give wells
+    @param wellcounts: the weights of 1, 2 and 3 wells on a cell with wells
+    @param xcells: the fraction of the cells with wells to mark "x"
+    @return: the list of rows of cell strings, as returned by
+             giganten.read_board()
+    """
+    rnd = random.Random(seed)
+    ncells = rows * columns
+    cell_terrain = rnd.choices((1, 2, 3), weights=terrain, k=ncells)
+    cell_wells = [0] * ncells
+    cell_variant = [NO_VARIANT] * ncells
+    adj_start, adj_index = grid_adjacency(rows, columns)
+    wanted = round(wells * ncells)
+    placed = []
+    order = list(range(ncells))
+    rnd.shuffle(order)
+    for index in order:
+        if len(placed) == wanted:
+            break
+        if index % columns == 0:
+            continue
+        if any(cell_wells[i] for i in
+               adj_index[adj_start[index]:adj_start[index + 1]]):
+            continue
+        cell_wells[index] = rnd.choices((1, 2, 3), weights=wellcounts)[0]
+        placed.append(index)
+    for index in rnd.sample(placed, round(xcells * len(placed))):
+        cell_variant[index] = VARIANT_X
+    cells = [format_cell(*cell) for cell in zip(cell_terrain, cell_wells,
+                                                cell_variant)]
+    return [cells[r * columns:(r + 1) * columns] for r in range(rows)]
+
+
+def write_board(board, outfile, comment=None):
+    """
+    Write a board in the layout of data/rawboard.csv.
+    @param board: a list of rows of cell strings
+    @param outfile: the open file to write to
+    @param comment: a line to write first, after a "#"
+    @return: None
+    """
+    if comment:
+        print(f'# {comment}', file=outfile)
+    for row in board:
+        print(''.join(f'{cell:>5}' for cell in row), file=outfile)
+
+
+def main():
+    board = generate_board(_args.rows, _args.columns, _args.seed,
+                           _args.terrain, _args.wells, _args.wellcounts,
+                           _args.xcells)
+    comment = (f'board_generator.py -r {_args.rows} -c {_args.columns} '
+               f'--seed {_args.seed} '
+               f'--terrain {" ".join(map(str, _args.terrain))} '
+               f'--wells {_args.wells} '
+               f'--wellcounts {" ".join(map(str, _args.wellcounts))} '
+               f'--xcells {_args.xcells}')
+    if _args.outfile == '-':
+        write_board(board, sys.stdout, comment)
+    else:
+        with open(_args.outfile, 'w') as outfile:
+            write_board(board, outfile, comment)
+
+
+def getargs():
+    parser = argparse.ArgumentParser(description='''
+        Generate a random board for giganten.
+        ''')
+    parser.add_argument('outfile', help='''
+    The CSV file to write, or "-" for standard output.''')
+    parser.add_argument('-c', '--columns', type=int, default=20, help='''
+    The number of columns. The default is 20.''')
+    parser.add_argument('-r', '--rows', type=int, default=12, help='''
+    The number of rows. The default is 12. A 4-player game needs at least
+    10.''')
+    parser.add_argument('--seed', type=int, default=1, help='''
+    The seed of the random number generator. The default is 1.''')
+    parser.add_argument('--terrain', type=float, nargs=3,
+                        default=DEFAULT_TERRAIN, help=f'''
+    The weights of flat, hilly and mountain terrain. The default is
+    {' '.join(map(str, DEFAULT_TERRAIN))}.''')
+    parser.add_argument('--wellcounts', type=float, nargs=3,
+                        default=DEFAULT_WELLCOUNTS, help=f'''
+    The weights of 1, 2 and 3 wells on a cell with wells. The default is
+    {' '.join(map(str, DEFAULT_WELLCOUNTS))}.''')
+    parser.add_argument('--wells', type=float, default=DEFAULT_WELLS,
+                        help=f'''
+    The fraction of the cells with wells. The default is {DEFAULT_WELLS}.''')
+    parser.add_argument('--xcells', type=float, default=DEFAULT_XCELLS,
+                        help=f'''
+    The fraction of the cells with wells marked "x", to be ignored in
+    3-player games. The default is {DEFAULT_XCELLS}.''')
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == '__main__':
+    assert sys.version_info >= (3, 11)
+    if len(sys.argv) == 1:
+        sys.argv.append('-h')
+    _args = getargs()
+    main()
@@ -0,0 +1,286 @@
+"""
+Compare the shortest path implementations in this repository on a board.
+
+giganten's searches (giganten.SEARCHES) work on the Graph itself.
+dijkstra.EdgeGraph is built from a list of edges. shortest_path.dijkstra
+takes a shortest_path.Graph of Vertex objects. board_edges() turns a Graph
+into the directed edges the other two share: an edge from each node to each
+passable neighbor, costing the neighbor's terrain, which is the cost
+giganten charges for moving there.
+
+A query is a search for the distance from one root to every node.
+run_queries() times each query with time.perf_counter_ns() and checks that
+every implementation finds the same distances as the first. giganten's
+searches are meant to be drop-in replacements for each other: choose_goal()
+and so the seeded games depend on the order in which the nodes are visited
+and on the previous node chosen on a tie. So they are also checked for the
+same visit order and previous nodes as the first, which is a giganten
+search, and these mismatches are reported separately. The slow
+implementations are given a time budget rather than making the whole run
+wait for them. The timed searches are unbounded, since only giganten's take
+a maximum cost.
+
+The games search with a maximum cost, the movement of the player's action
+card, and stop at it: a node with wells at the maximum cost or beyond isn't
+visited, since a truck can't stop there. check_bounded() queries each root
+again with every movement on the cards, untimed. The other implementations'
+unbounded distances are cut down by the same rule, in bounded(), and all
+are checked for the same visited nodes, then the same distances, and
+giganten's searches for the same visit order.
+
+Called by giganten --timeit. For other board sizes, give giganten a board
+made by board_generator.py.
+"""
+import random
+import statistics
+import sys
+import time
+
+import config
+import dijkstra as edge_dijkstra
+import shortest_path
+
+# The maximum costs the games search with: the movement of each action card
+MOVEMENTS = sorted({card.movement for card in config.RED_ACTION_CARDS
+                    + config.BEIGE_ACTION_CARDS})
+
+
+def board_edges(graph):
+    """
+    @param graph: a graph.Graph
+    @return: a list of (from index, to index, cost) for each move on the
+             board
+    """
+    return [(node.index, neighbor.index, neighbor.terrain)
+            for node in graph.graph for neighbor in node.passable]
+
+
+def vertex_graph(edges, nnodes):
+    """
+    @return: a shortest_path.Graph of the edges. Its add_edge() adds both
+             directions at the same cost, so the neighbors are added one way
+             at a time instead.
+    """
+    vgraph = shortest_path.Graph()
+    for index in range(nnodes):
+        vgraph.add_vertex(index)
+    for frm, to, cost in edges:
+        vgraph.get_vertex(frm).add_neighbor(vgraph.get_vertex(to), cost)
+    return vgraph
+
+
+def bounded(graph, distances, root, maxcost):
+    """
+    @param distances: the unbounded distances from root
+    @return: the distances of the nodes giganten.dijkstra() visits with this
+             maxcost, sys.maxsize for the others: those at most maxcost
+             away, except nodes with wells at maxcost or more
+    """
+    if maxcost == sys.maxsize:
+        return distances
+    wells = graph.wells
+    return [dist if dist <= maxcost and not (wells[index] and dist >= maxcost)
+            or index == root else sys.maxsize
+            for index, dist in enumerate(distances)]
+
+
+def giganten_query(graph, search):
+    """
+    @return: a query function of a root and a maximum cost using search, one
+             of giganten.SEARCHES. It returns the distances and a list of
+             (index, previous index) of the nodes in the order they were
+             visited.
+    """
+    nnodes = len(graph.graph)
+
+    def query(root, maxcost=sys.maxsize):
+        visited, _ = search(graph, graph.graph[root], maxcost, verbose=0)
+        distances = [sys.maxsize] * nnodes
+        order = []
+        for node in visited:
+            distances[node.index] = node.distance
+            previous = node.get_previous()
+            order.append((node.index, previous.index if previous else -1))
+        return distances, order
+
+    return query
+
+
+def edges_query(graph, edges):
+    """
+    @return: a query function using a dijkstra.EdgeGraph, built once. It
+             returns the distances and None for the visit order, which isn't
+             compared.
+    """
+    nnodes = len(graph.graph)
+    egraph = edge_dijkstra.EdgeGraph(edges)
+
+    def query(root, maxcost=sys.maxsize):
+        distances, _ = egraph.search(root)
+        return bounded(graph, [distances.get(index, sys.maxsize)
+                               for index in range(nnodes)],
+                       root, maxcost), None
+
+    return query
+
+
+def vertex_query(graph, edges):
+    """
+    @return: a query function using shortest_path.dijkstra, returning the
+             distances and None for the visit order
+    """
+    nnodes = len(graph.graph)
+    vgraph = vertex_graph(edges, nnodes)
+    vertices = [vgraph.get_vertex(index) for index in range(nnodes)]
+
+    def query(root, maxcost=sys.maxsize):
+        shortest_path.dijkstra(vgraph, vertices[root], verbose=False)
+        return bounded(graph, [vertex.distance for vertex in vertices],
+                       root, maxcost), None
+
+    return query
+
+
+def implementations(graph, searches):
+    """
+    @param graph: a graph.Graph
+    @param searches: giganten.SEARCHES
+    @return: a dict of name: query function for each implementation
+    """
+    edges = board_edges(graph)
+    queries = {f'giganten.dijkstra[{name}]': giganten_query(graph, search)
+               for name, search in searches.items()}
+    queries['dijkstra.EdgeGraph'] = edges_query(graph, edges)
+    queries['shortest_path.dijkstra'] = vertex_query(graph, edges)
+    return queries
+
+
+def differences(result, expected):
+    """
+    @param result: the (distances, visit order) returned by a query
+    @param expected: those returned by the first implementation
+    @return: a list of what differs: 'visited' if the visited nodes do, else
+             'distances' if their distances do, and 'visit order' if the
+             visit order or previous nodes do
+    """
+    distances, order = result
+    expected_distances, expected_order = expected
+    found = []
+    if ([dist == sys.maxsize for dist in distances]
+            != [dist == sys.maxsize for dist in expected_distances]):
+        found.append('visited')
+    elif distances != expected_distances:
+        found.append('distances')
+    if (order is not None and expected_order is not None
+            and order != expected_order):
+        found.append('visit order')
+    return found
+
+
+def run_queries(queries, roots, repeat, budget):
+    """
+    Query each root with every implementation, timing each query and
+    checking its distances against the first implementation's. Once an
+    implementation other than the first has spent budget seconds, it is
+    skipped for the remaining queries.
+    @param queries: the dict returned by implementations()
+    @param roots: the node indices to search from
+    @param repeat: the number of times to query each root
+    @param budget: the time in seconds allowed for each implementation
+    @return: a dict of name: the list of query times in nanoseconds, and a
+             list of (root, maxcost, name, what) for each difference from
+             the first implementation's result; what is as returned by
+             differences() and maxcost is sys.maxsize
+    """
+    budget_ns = budget * 1e9
+    times = {name: [] for name in queries}
+    spent = dict.fromkeys(queries, 0)
+    mismatches = []
+    first = next(iter(queries))
+    for _ in range(repeat):
+        for root in roots:
+            expected = None
+            for name, query in queries.items():
+                if name != first and spent[name] >= budget_ns:
+                    continue
+                start = time.perf_counter_ns()
+                result = query(root)
+                elapsed = time.perf_counter_ns() - start
+                times[name].append(elapsed)
+                spent[name] += elapsed
+                if expected is None:
+                    expected = result
+                    continue
+                mismatches.extend((root, sys.maxsize, name, what)
+                                  for what in differences(result, expected))
+    return times, mismatches
+
+
+def check_bounded(queries, roots, maxcosts=MOVEMENTS):
+    """
+    Query each root with each maximum cost, checking every implementation
+    against the first as run_queries() does, untimed.
+    @param maxcosts: the maximum costs, by default the card movements
+    @return: a list of (root, maxcost, name, what) for each difference
+    """
+    mismatches = []
+    for root in roots:
+        for maxcost in maxcosts:
+            expected = None
+            for name, query in queries.items():
+                result = query(root, maxcost)
+                if expected is None:
+                    expected = result
+                    continue
+                mismatches.extend((root, maxcost, name, what)
+                                  for what in differences(result, expected))
+    return mismatches
+
+
+def compare(graph, searches, nroots, repeat=3, budget=10, seed=None):
+    """
+    Check and time the implementations on a board and print a report.
+    Called if the --timeit command-line option is selected.
+    @param graph: a graph.Graph
+    @param searches: giganten.SEARCHES
+    @param nroots: the number of roots, chosen at random
+    @param repeat: the number of times to query each root
+    @param budget: the time in seconds allowed for each implementation
+    @param seed: the seed for choosing the roots
+    @return: True if all the implementations visited the same nodes at the
+             same distances and giganten's searches in the same order with
+             the same previous nodes, both unbounded and with each card
+             movement as the maximum cost
+    """
+    nnodes = len(graph.graph)
+    roots = random.Random(seed).sample(range(nnodes), min(nroots, nnodes))
+    queries = implementations(graph, searches)
+    times, mismatches = run_queries(queries, roots, repeat, budget)
+    mismatches += check_bounded(queries, roots)
+    print(f'{graph.rows}x{graph.columns} board, {len(roots)} roots, '
+          f'{repeat} repetitions, maximum costs '
+          f'{" ".join(map(str, MOVEMENTS))} and none.')
+    found = {what for _, _, _, what in mismatches}
+    for root, maxcost, name, what in mismatches:
+        within = f' within {maxcost}' if maxcost < sys.maxsize else ''
+        what = {'visited': 'visited nodes',
+                'visit order': 'visit order or previous nodes'}.get(what, what)
+        print(f'{name}: {what} from {graph.graph[root].id}{within} differ')
+    if not found & {'visited', 'distances'}:
+        print('All implementations visited the same nodes at the same '
+              'distances.')
+    if 'visit order' not in found:
+        print("giganten's searches visited the nodes in the same order with "
+              "the same previous nodes.")
+    baseline = None
+    print(f'{"implementation":<30} {"queries":>8} {"median us":>12} '
+          f'{"p90 us":>12} {"speedup":>8}')
+    for name, samples in times.items():
+        median = statistics.median(samples) / 1000
+        p90 = (statistics.quantiles(samples, n=10)[8] / 1000
+               if len(samples) > 1 else median)
+        if baseline is None:
+            baseline = median
+        print(f'{name:<30} {len(samples):>8} {median:>12.1f} {p90:>12.1f} '
+              f'{baseline / median:>8.2f}')
+    return not mismatches
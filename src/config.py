@@ -127,6 +127,25 @@ TRUCK_COLUMN_MULTIPLIER = 1
 PREV_GOAL_MULTIPLER = 1
 TRAIN_COLUMN_MULTIPLIER = 1
 
+"""
+    The multipliers above as one value, held by each Player so that players
+    in the same game can use different weights. See tune_weights.py.
+
+    goal: GOAL_MULTIPLIER
+    column: TRUCK_COLUMN_MULTIPLIER
+    prev_goal: PREV_GOAL_MULTIPLER
+    train: TRAIN_COLUMN_MULTIPLIER
+"""
+Weights = namedtuple('Weights', 'goal column prev_goal train')
+DEFAULT_WEIGHTS = Weights(GOAL_MULTIPLIER, TRUCK_COLUMN_MULTIPLIER,
+                          PREV_GOAL_MULTIPLER, TRAIN_COLUMN_MULTIPLIER)
+
+"""
+    The weight of exploration against the mean reward in the UCB1 formula
+    used by giganten.select_card() to choose which card to roll out next.
+"""
+MCTS_EXPLORATION = 2 ** 0.5
+
 """
     Define trace levels
 """
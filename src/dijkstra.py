@@ -1,10 +1,17 @@
 """
+Dijkstra's algorithm on a graph given as a list of (from, to, cost) edges.
 
+EdgeGraph builds the adjacency lists once and can then be searched any number
+of times, for the path to one target, the distances to several targets, or
+the distances to every reachable node. A search returns flat dicts of the
+distance and the previous node of each node it reached; path_to() follows
+the previous nodes back to the root. dijkstra() is the original one-shot
+interface, which builds an EdgeGraph for each call.
 """
 from collections import defaultdict
-from heapq import *
+from heapq import heappop, heappush
 
-TRACE = True
+TRACE = False
 
 
 def trace(s):
@@ -13,7 +20,7 @@ def trace(s):
 
 
 def unwindpath(p):
-    # Turn the path in the form (cost,(e, (b, (a, ())))) into (cost, [a, b, e])
+    # Turn the path in the form (cost,(e, (b, (a, ())))) into (cost, [e, b, a])
     cost = p[0]
     pp = []
     q = p
@@ -23,44 +30,110 @@ def unwindpath(p):
     return cost, pp
 
 
-def dijkstra(edges, from_node, to_node, two_way=False):
-    graph = defaultdict(list)
-    for fromnode, tonode, cost in edges:
-        graph[fromnode].append((cost, tonode))
-        if two_way:
-            graph[tonode].append((cost, fromnode))
-    del fromnode, tonode
-    node_queue = [(0, from_node, list())]
-    seen = set()
-    mins = {from_node: 0}
-    while node_queue:
-        trace(f'{node_queue=}')
-        # v1 is the lowest cost node in the queue
-        cost, v1, path = heappop(node_queue)
-        trace(f'  {cost=}, {v1=}, {path=}')
-        if v1 not in seen:
-            seen.add(v1)
-            trace(f'  {seen=}')
-            path = (v1, path)
-            trace(f'  {path=}')
-            if v1 == to_node:
-                trace(f'returning {cost=}, {path=}')
-                return cost, path
-            # v2
-            for next_step_cost, v2 in graph.get(v1, ()):
-                trace(f'    {v2=}, {next_step_cost=}')
-                if v2 in seen:
-                    trace('    skip')
+def path_to(previous, node):
+    """
+    :param previous: the dict of previous nodes returned by EdgeGraph.search()
+    :param node: a node reached by the search
+    :return: the list of nodes from the root of the search to node
+    """
+    path = []
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    path.reverse()
+    return path
+
+
+class EdgeGraph:
+    """
+    A directed graph built from a list of edges, to be searched repeatedly.
+    The nodes can be any hashable values and the costs must not be negative.
+    """
+
+    def __init__(self, edges, two_way=False):
+        """
+        :param edges: an iterable of (from node, to node, cost)
+        :param two_way: if True, each edge can also be followed backwards
+        """
+        adjacent = defaultdict(list)
+        for fromnode, tonode, cost in edges:
+            adjacent[fromnode].append((cost, tonode))
+            if two_way:
+                adjacent[tonode].append((cost, fromnode))
+        self.adjacent = dict(adjacent)
+
+    def search(self, from_node, targets=None, maxcost=float('inf')):
+        """
+        Find the shortest distances from from_node. The queue uses lazy
+        deletion: a node is pushed again when a shorter distance is found and
+        the stale entries are skipped when they are popped.
+        :param from_node: the root of the search
+        :param targets: if given, stop once all these nodes have been reached
+        :param maxcost: don't reach nodes further than this
+        :return: a dict of node: distance and a dict of node: previous node
+                 (None for from_node) for each node reached
+        """
+        adjacent = self.adjacent
+        remaining = None if targets is None else set(targets)
+        distances = {}
+        previous = {}
+        best = {from_node: 0}
+        # The sequence number breaks ties, so the nodes are never compared.
+        node_queue = [(0, 0, from_node, None)]
+        count = 1
+        while node_queue:
+            # v1 is the lowest cost node in the queue
+            cost, _, v1, prev = heappop(node_queue)
+            if v1 in distances:
+                continue
+            distances[v1] = cost
+            previous[v1] = prev
+            if TRACE:
+                trace(f'  {cost=}, {v1=}, {prev=}')
+            if remaining is not None:
+                remaining.discard(v1)
+                if not remaining:
+                    break
+            for next_step_cost, v2 in adjacent.get(v1, ()):
+                if v2 in distances:
                     continue
-                prev = mins.get(v2, None)
                 nextcost = cost + next_step_cost
-                trace(f'    {prev=}, {nextcost=}')
-                if prev is None or nextcost < prev:
-                    trace(f'    mins[{v2}] = {nextcost}, pushing ({nextcost}, {v2}, {path})')
-                    mins[v2] = nextcost
-                    heappush(node_queue, (nextcost, v2, path))
+                if nextcost > maxcost:
+                    continue
+                known = best.get(v2)
+                if known is None or nextcost < known:
+                    if TRACE:
+                        trace(f'    best[{v2}] = {nextcost}')
+                    best[v2] = nextcost
+                    heappush(node_queue, (nextcost, count, v2, v1))
+                    count += 1
+        return distances, previous
+
+    def shortest_path(self, from_node, to_node):
+        """
+        :return: the cost and the list of nodes of the shortest path from
+                 from_node to to_node, or None if to_node can't be reached
+        """
+        distances, previous = self.search(from_node, (to_node,))
+        if to_node not in distances:
+            return None
+        return distances[to_node], path_to(previous, to_node)
 
-    return float("inf")
+
+def dijkstra(edges, from_node, to_node, two_way=False):
+    """
+    :return: (cost, path), where the path is in the form
+             (e, (b, (a, []))) to be unwound by unwindpath(), or
+             float("inf") if to_node can't be reached
+    """
+    found = EdgeGraph(edges, two_way).shortest_path(from_node, to_node)
+    if found is None:
+        return float("inf")
+    cost, nodes = found
+    path = list()
+    for node in nodes:
+        path = (node, path)
+    return cost, path
 
 
 def main():
@@ -83,8 +156,11 @@ def main():
     print("A -> E:")
     print('result:', pp := dijkstra(edges, "A", "G", two_way=False))
     print('unwound:', unwindpath(pp))
-    # print("F -> G:")
-    # print('result:',dijkstra(edges, "F", "G"))
+    graph = EdgeGraph(edges)
+    distances, previous = graph.search("A")
+    print('distances from A:', distances)
+    print('previous:', previous)
+    print('A -> G:', path_to(previous, "G"))
 
 
 if __name__ == "__main__":
@@ -2,38 +2,185 @@
 
 """
 import argparse
+from collections import deque
 from typing import NamedTuple
 import config
 import copy
 import heapq
-import inspect
+import math
+import multiprocessing
+from operator import itemgetter
 import os.path
 import random
 import sys
 import time
 from colorama import Fore, Style
 
-from test.test_dijkstra import time_dijkstra, one_dijkstra
+from test.test_dijkstra import one_dijkstra
+import board_cache
+import compare_searches
 from node import Node
 from graph import Graph
-from player import Player
+from player import Player, TRAIN_ADVANCE, hist_entry, train_advance
 import oil_price
+from search_cache import SearchCache, export_result
+from sequential import WinRates
+
+
+def _print_trace(frame, template, args, color):
+    fileinfo = f'{frame.f_lineno}: {frame.f_code.co_name}'
+    if color:
+        print(fileinfo,
+              f'{color}{template.format(*args)}{Style.RESET_ALL}')
+    else:
+        print(fileinfo, template.format(*args))
+
+
+def _trace(template, *args, color=None):
+    _print_trace(sys._getframe(1), template, args, color)
+
+
+def _no_trace(template, *args, color=None):
+    pass
 
 
 def trace(level, template, *args, color=None):
-    if _args.verbose >= level:
-        stack = inspect.stack()
-        # fileinfo = f'{module_name}: {stack[1][2]}: {stack[1][3]}'
-        fileinfo = f'{stack[1][2]}: {stack[1][3]}'
-        if color:
-            print(fileinfo,
-                  f'{color}{template.format(*args)}{Style.RESET_ALL}')
-        else:
-            print(fileinfo, template.format(*args))
+    """
+    Print the message if the verbosity is at least level. Use trace2, trace3
+    or trace4 when the level is known; they cost only a call when disabled.
+    In the simulation's inner loops, test _verbose before calling so that
+    even the arguments aren't evaluated.
+    """
+    if _verbose >= level:
+        _print_trace(sys._getframe(1), template, args, color)
+
+
+def set_verbose(verbose):
+    """
+    Called once at startup, and in each worker process, to bind the trace
+    functions for the verbosity level.
+    @param verbose: the --verbose argument
+    @return: None
+    """
+    global _verbose, trace2, trace3, trace4
+    _verbose = verbose
+    trace2 = _trace if verbose >= 2 else _no_trace
+    trace3 = _trace if verbose >= 3 else _no_trace
+    trace4 = _trace if verbose >= 4 else _no_trace
+
+
+set_verbose(1)
+
+# The phases of a turn timed by one_turn() and finish_turn()
+PHASES = ('1 price change', '2 card draw', '3 licenses', '4 movement',
+          '5 rigs', '6 transport', '7 selling', '8 tank limits')
+_timing = False  # set by set_timing() for --phasetimes
+_times: dict[str, list[int]] = {}  # add_time(): name -> [calls, nanoseconds]
+
+
+def add_time(name, start):
+    """
+    Add a call that ran from start until now to the totals for a phase or
+    function. Called only if _timing is set; otherwise the phases of a turn
+    cost one test of _timing each.
+    @param name: the phase or function
+    @param start: the time.perf_counter_ns() when it started
+    @return: the time now, the start of the next phase
+    """
+    now = time.perf_counter_ns()
+    total = _times.get(name)
+    if total is None:
+        total = _times[name] = [0, 0]
+    total[0] += 1
+    total[1] += now - start
+    return now
+
+
+def timed(name, function):
+    """
+    @return: a wrapper of function that adds its calls to the totals for
+             name while _timing is set
+    """
+    def timed_function(*args, **kwargs):
+        if not _timing:
+            return function(*args, **kwargs)
+        start = time.perf_counter_ns()
+        result = function(*args, **kwargs)
+        add_time(name, start)
+        return result
+
+    timed_function.__wrapped__ = function
+    return timed_function
+
+
+def set_timing(timing):
+    """
+    Called once at startup, and in each worker process, for --phasetimes.
+    If timing, choose_goal() and the searches are replaced by timed()
+    wrappers; otherwise nothing changes.
+    @param timing: the --phasetimes argument
+    @return: None
+    """
+    global _timing, choose_goal
+    _timing = timing
+    if timing and not hasattr(choose_goal, '__wrapped__'):
+        choose_goal = timed('choose_goal', choose_goal)
+        for name, search in SEARCHES.items():
+            SEARCHES[name] = timed(f'dijkstra[{name}]', search)
+
+
+def take_times():
+    """
+    @return: the totals accumulated by add_time() since the last call, to
+             be merged with merge_times()
+    """
+    times = dict(_times)
+    _times.clear()
+    return times
+
+
+def merge_times(times):
+    for name, (calls, ns) in times.items():
+        total = _times.setdefault(name, [0, 0])
+        total[0] += calls
+        total[1] += ns
+
+
+def print_times():
+    """
+    Print the time spent in each phase of the turns and in choose_goal() and
+    the searches, which are part of 4 movement, as a percentage of the
+    total time of the turns.
+    """
+    turns_ns = sum(_times.get(phase, (0, 0))[1] for phase in PHASES)
+    print(f'{"phase":<18} {"calls":>10} {"total ms":>12} {"mean us":>10} '
+          f'{"% turns":>8}')
+    names = list(PHASES) + sorted(name for name in _times
+                                  if name not in PHASES)
+    for name in names:
+        if name not in _times:
+            continue
+        calls, ns = _times[name]
+        label = name if name in PHASES else '  ' + name
+        print(f'{label:<18} {calls:>10} {ns / 1e6:>12.1f} '
+              f'{ns / calls / 1e3:>10.1f} '
+              f'{100 * ns / turns_ns if turns_ns else 0:>8.1f}')
+    print(f'{"total":<18} {"":>10} {turns_ns / 1e6:>12.1f}')
+
+
+_graphs: dict[int, Graph] = {}  # pooled_graph(): nplayers -> Graph of _rawboard
+_mcts_players = frozenset()  # the ids of the players using select_card()
+_search_cache: SearchCache | None = None  # set for --searchcache
 
 
 class Game:
-    def __init__(self, graph: Graph, nplayers):
+    def __init__(self, graph: Graph, nplayers, weights=None):
+        """
+        @param graph: the board, reset for a new game
+        @param nplayers:
+        @param weights: a config.Weights for each player, or None for
+                        config.DEFAULT_WEIGHTS for all
+        """
         assert nplayers <= len(config.TRUCK_INIT_ROWS)
         self.nplayers = nplayers
         self.black_train_col = 0
@@ -43,11 +190,13 @@ class Game:
         self.oil_marker_stockpile = config.INITIAL_OIL_MARKERS
         for n in range(nplayers):
             trucknode: Node = graph.board[config.TRUCK_INIT_ROWS[n]][0]
-            player = Player(n, trucknode)
-            trucknode.truck = player
+            player = Player(n, trucknode, weights[n] if weights
+                            else config.DEFAULT_WEIGHTS)
+            trucknode.set_truck(player)
             self.players.append(player)
-        self.beige_action_cards = copy.deepcopy(config.BEIGE_ACTION_CARDS)
-        self.red_action_cards = copy.deepcopy(config.RED_ACTION_CARDS)
+        # The cards are immutable, so the decks share them with config.
+        self.beige_action_cards = list(config.BEIGE_ACTION_CARDS)
+        self.red_action_cards = list(config.RED_ACTION_CARDS)
         self.beige_discards = []
         self.red_discards = []
         random.shuffle(self.beige_action_cards)
@@ -59,13 +208,90 @@ class Game:
             # Select a random tile from the shuffled list according
             # to the number of wells. Indicate that this is the amount
             # of oil underground.
-            node.oil_reserve = tiles[node.wells].pop() if node.wells else 0
-        self.licenses = copy.deepcopy(config.LICENSE_CARDS)
+            if node.wells:
+                pile = tiles[node.wells]
+                if not pile:
+                    # A board with more wells than the standard one: take
+                    # another set of tiles.
+                    pile.extend(config.TILES[node.wells])
+                    random.shuffle(pile)
+                node.oil_reserve = pile.pop()
+            else:
+                node.oil_reserve = 0
+        self.licenses = list(config.LICENSE_CARDS)
         # print(f'\n{self.licenses=}')
         self.license_discards = []
         self.licenses_exhausted = False
         random.shuffle(self.licenses)
 
+    def snapshot(self):
+        """
+        Capture everything that changes during the game: the prices, the
+        decks and discards, the black train, the players and the board. The
+        cards are immutable, so the lists are copied to tuples without
+        copying the cards. The random number generator isn't included.
+        @return: a value to pass to restore()
+        """
+        return (self.black_train_col, tuple(self.selling_price),
+                self.oil_marker_stockpile, tuple(self.beige_action_cards),
+                tuple(self.red_action_cards), tuple(self.beige_discards),
+                tuple(self.red_discards), tuple(self.licenses),
+                tuple(self.license_discards), self.licenses_exhausted,
+                tuple(player.snapshot() for player in self.players),
+                self.graph.snapshot_nodes())
+
+    def restore(self, state):
+        """
+        Return the game to the state returned by snapshot(). A snapshot can
+        be restored any number of times, for example to try several moves
+        from the same position.
+        @param state: the value returned by snapshot() of this game
+        @return: None
+        """
+        (self.black_train_col, selling_price, self.oil_marker_stockpile,
+         beige_action_cards, red_action_cards, beige_discards, red_discards,
+         licenses, license_discards, self.licenses_exhausted, players,
+         nodes) = state
+        self.selling_price = list(selling_price)
+        self.beige_action_cards = list(beige_action_cards)
+        self.red_action_cards = list(red_action_cards)
+        self.beige_discards = list(beige_discards)
+        self.red_discards = list(red_discards)
+        self.licenses = list(licenses)
+        self.license_discards = list(license_discards)
+        moved = []
+        for player, player_state in zip(self.players, players):
+            if player.truck_node is not player_state[0]:
+                player.truck_node.truck = None
+                moved.append(player.truck_node)
+            player.restore(player_state)
+        for player in self.players:
+            if player.truck_node.truck is not player:
+                player.truck_node.truck = player
+                moved.append(player.truck_node)
+        self.graph.restore_nodes(nodes, moved)
+
+    def determinize(self):
+        """
+        Replace the information hidden from the players with a random
+        guess: shuffle the draw piles and the oil reserves of the tiles not
+        yet built on among the sites with the same number of wells. Called
+        on a snapshot before a rollout so that it doesn't see the future.
+        @return: None
+        """
+        random.shuffle(self.beige_action_cards)
+        random.shuffle(self.red_action_cards)
+        random.shuffle(self.licenses)
+        tiles = {}
+        for node in self.graph.volatile:
+            if node.wells and not node.derrick:
+                tiles.setdefault(node.wells, []).append(node)
+        for nodes in tiles.values():
+            reserves = [node.oil_reserve for node in nodes]
+            random.shuffle(reserves)
+            for node, reserve in zip(nodes, reserves):
+                node.oil_reserve = reserve
+
     def move_black_train(self, spaces_to_move):
         self.black_train_col += spaces_to_move
         game_ended = self.black_train_col >= self.graph.columns
@@ -123,7 +349,7 @@ def deal_licenses(player: Player, game: Game):
         if card is None:
             if not game.licenses_exhausted:
                 game.licenses_exhausted = True
-                trace(2, 'Licenses exhausted')
+                trace2('Licenses exhausted')
             break
         if card.num_licenses == 1:
             player.single_licenses.append(card)
@@ -180,10 +406,29 @@ def read_board(csvfile):
         rawboard = r
     # if _args.verbose >= 2:
     #     print('rawboard:', rawboard)
-    trace(3, '{}', rawboard)
+    trace3('{}', rawboard)
     return rawboard
 
 
+def load_board(csvfile):
+    """
+    :param csvfile: the open board CSV file
+    :return: the board as returned by read_board() or, with --boardcache, a
+             board_cache.CompiledBoard
+    """
+    if _args.boardcache and os.path.isfile(csvfile.name):
+        csvfile.close()
+        return board_cache.load_board(csvfile.name, _args.bycols, read_board,
+                                      _args.verifycache)
+    return read_board(csvfile)
+
+
+# Sort key for the (previous distance, node) lists built in the searches.
+# Neighbors are queued in order of their distance before being updated, the
+# order they had when the searches sorted the adjacent nodes by distance.
+_old_distance = itemgetter(0)
+
+
 def dijkstra(graph: Graph, root: Node, maxcost=sys.maxsize, verbose=1):
     """
     :param: graph: So we can clear it before updating its Nodes
@@ -197,58 +442,81 @@ def dijkstra(graph: Graph, root: Node, maxcost=sys.maxsize, verbose=1):
              board that is reachable from the root node given the game's
              constraints such as within the maximum distance from the root
              where the "distance" is the sum of the costs of entering each
-             node depending on the terrain.
+             node depending on the terrain. Nodes not reached keep the
+             distance and previous of an earlier search; they are stale
+             because their stamp isn't the graph's current epoch.
     """
 
     def idist(distance):
         return "∞" if distance == sys.maxsize else distance
 
-    graph.reset_graph()  # distances = ∞, clear previous
+    def distance(node):
+        return node.distance if node.stamp == epoch else sys.maxsize
+
+    tracing3 = verbose >= 3
+    tracing4 = verbose >= 4
+    epoch = graph.new_search()
     root.distance = 0
-    unvisited_queue = [root]
+    root.previous = None
+    root.path_goal = 0
+    root.stamp = epoch
+    # The queue holds (distance, sequence, node) so that nodes at the same
+    # distance are popped in the order they were pushed.
+    seq = 0
+    unvisited_queue = [(0, seq, root)]
     visited = dict()  # Use a dictionary instead of a set to preserve order
     goals = set()
     while unvisited_queue:
         # Pops a vertex with the smallest distance
-        current = heapq.heappop(unvisited_queue)
+        current = heapq.heappop(unvisited_queue)[2]
+        if current in visited:  # an earlier entry with a longer distance
+            continue
         visited[current] = None  # kludge an ordered set
         if current.goal:
             goals.add(current)
         # trace(3, 'current={} current.adjacent={}', current, current.adjacent)
         if current.distance >= maxcost:
-            trace(3, '    stopping at distance {}.', current.distance)
+            if tracing3:
+                trace3('    stopping at distance {}.', current.distance)
             continue
-        for nextn in sorted(current.adjacent):  # iterate over adjacent nodes
-            trace(4, 'nextn={}, current={} {}', nextn, current,
-                  "DERRICK" if nextn.derrick else "")
+        updates = []  # (previous distance, node) of the updated nodes
+        # iterate over adjacent nodes without a derrick or truck
+        for nextn in current.passable:
+            if tracing4:
+                trace4('nextn={}, current={}', nextn, current)
             if nextn in visited:  # if visited, skip
-                trace(4, 'skipping, visited: nextn={}, current={}', nextn,
-                      current)
-                continue
-            if nextn.derrick or nextn.truck:
-                trace(4, 'skipping, derrick or truck: nextn={}, current={}',
-                      nextn, current)
+                if tracing4:
+                    trace4('skipping, visited: nextn={}, current={}', nextn,
+                           current)
                 continue
             new_dist = current.distance + nextn.terrain
-            nextn_dist = nextn.distance
+            nextn_dist = distance(nextn)
             #
             # If the next node has wells, the player may not stop there.
             if nextn.wells and new_dist >= maxcost:
-                trace(4, 'skipping, wells: nextn={}, current={}', nextn,
-                      current)
+                if tracing4:
+                    trace4('skipping, wells: nextn={}, current={}', nextn,
+                           current)
                 continue
             if new_dist < nextn_dist and new_dist <= maxcost:
                 nextn.distance = new_dist
                 nextn.previous = current
-                heapq.heappush(unvisited_queue, nextn)
+                nextn.path_goal = current.path_goal + current.goal
+                nextn.stamp = epoch
+                updates.append((nextn_dist, nextn))
                 updated = 'updated'  # just used for logging
             else:
                 updated = 'not updated'
-            if verbose >= 3:
+            if tracing3:
                 # print('%s : current = %s next = %s new_dist = %s'
                 #       % (updated, current.id, nextn.id, nextn_dist))
                 print(f'{updated}: current: {current.id}, next: {nextn.id}, '
-                      f'dist: {idist(nextn_dist)} -> {idist(nextn.distance)}')
+                      f'dist: {idist(nextn_dist)} -> {idist(distance(nextn))}')
+        if len(updates) > 1:
+            updates.sort(key=_old_distance)
+        for _, nextn in updates:
+            seq += 1
+            heapq.heappush(unvisited_queue, (nextn.distance, seq, nextn))
         # trace(3, 'unvisited: {}', unvisited_queue)
     # Convert the set of goals into a list sorted by column
     # goals = sorted(list(goals), key=lambda node: node.col, reverse=True)
@@ -256,7 +524,167 @@ def dijkstra(graph: Graph, root: Node, maxcost=sys.maxsize, verbose=1):
     return visited, goals
 
 
-def choose_goal(player: Player, graph: Graph) -> Node:
+def dijkstra_array(graph: Graph, root: int, maxcost=sys.maxsize):
+    """
+    The same search as dijkstra() but using only the flat lists built by
+    Graph.reset(). The Nodes are neither read nor updated.
+
+    :param: graph: the Graph whose arrays are searched
+    :param: root: the index of the node to start from
+    :param: maxcost: Do not search for nodes more than maxcost away.
+    :return: A tuple (visited, distance, previous). visited is a list of the
+             indices of the reachable nodes in the order dijkstra() visits
+             them. distance and previous are the Graph's lists indexed by node
+             index; previous[root] is -1. The entries for nodes not in
+             visited are left over from earlier searches.
+    """
+    terrain = graph.terrain
+    wells = graph.wells
+    adj_passable = graph.adj_passable
+    distance = graph.distance
+    previous = graph.previous
+    reached = graph.reached  # == epoch if distance and previous are current
+    done = graph.done  # == epoch if visited
+
+    epoch = graph.new_search()
+    distance[root] = 0
+    previous[root] = -1
+    reached[root] = epoch
+    seq = 0
+    queue = [(0, seq, root)]
+    visited = []
+    heappop = heapq.heappop
+    heappush = heapq.heappush
+    while queue:
+        dist, _, current = heappop(queue)
+        if done[current] == epoch:
+            continue
+        done[current] = epoch
+        visited.append(current)
+        if dist >= maxcost:
+            continue
+        updates = []  # (previous distance, index) of the updated nodes
+        for nextn in adj_passable[current]:
+            if done[nextn] == epoch:
+                continue
+            new_dist = dist + terrain[nextn]
+            if wells[nextn] and new_dist >= maxcost:
+                continue
+            old_dist = distance[nextn] if reached[nextn] == epoch else sys.maxsize
+            if new_dist < old_dist and new_dist <= maxcost:
+                distance[nextn] = new_dist
+                previous[nextn] = current
+                reached[nextn] = epoch
+                updates.append((old_dist, nextn))
+        # Queue them in the same order as dijkstra() so that ties are broken
+        # the same way.
+        if len(updates) > 1:
+            updates.sort(key=_old_distance)
+        for _, nextn in updates:
+            seq += 1
+            heappush(queue, (distance[nextn], seq, nextn))
+    return visited, distance, previous
+
+
+def dijkstra_bucket(graph: Graph, root: Node, maxcost=sys.maxsize, verbose=1):
+    """
+    Dial's algorithm. The same search as dijkstra() with the same arguments
+    and result, but the heap is replaced by a circular list of FIFO buckets,
+    one per distance. This works because the cost of entering a node is a
+    small integer: all nodes queued while expanding a node at distance d have
+    distances d + 1 .. d + max(terrain), so max(terrain) + 1 buckets are
+    enough. Popping in FIFO order within a bucket gives the same tie-break as
+    the (distance, sequence) heap in dijkstra().
+    """
+    def distance(node):
+        return node.distance if node.stamp == epoch else sys.maxsize
+
+    epoch = graph.new_search()
+    root.distance = 0
+    root.previous = None
+    root.path_goal = 0
+    root.stamp = epoch
+    nbuckets = max(graph.terrain) + 1
+    buckets = [deque() for _ in range(nbuckets)]
+    buckets[0].append(root)
+    queued = 1  # the number of entries in all buckets
+    visited = dict()  # Use a dictionary instead of a set to preserve order
+    goals = set()
+    dist = 0
+    while queued:
+        bucket = buckets[dist % nbuckets]
+        while bucket:
+            current = bucket.popleft()
+            queued -= 1
+            if current in visited:  # an earlier entry with a longer distance
+                continue
+            visited[current] = None
+            if current.goal:
+                goals.add(current)
+            if dist >= maxcost:
+                continue
+            updates = []  # (previous distance, node) of the updated nodes
+            for nextn in current.passable:
+                if nextn in visited:
+                    continue
+                new_dist = dist + nextn.terrain
+                # If the next node has wells, the player may not stop there.
+                if nextn.wells and new_dist >= maxcost:
+                    continue
+                old_dist = distance(nextn)
+                if new_dist < old_dist and new_dist <= maxcost:
+                    nextn.distance = new_dist
+                    nextn.previous = current
+                    nextn.path_goal = current.path_goal + current.goal
+                    nextn.stamp = epoch
+                    updates.append((old_dist, nextn))
+            if len(updates) > 1:
+                updates.sort(key=_old_distance)
+            for _, nextn in updates:
+                buckets[nextn.distance % nbuckets].append(nextn)
+            queued += len(updates)
+        dist += 1
+    return visited, goals
+
+
+def dijkstra_nodes(graph: Graph, root: Node, maxcost=sys.maxsize, verbose=1):
+    """
+    Run dijkstra_array() and copy its result into the Nodes it reached so
+    that it can be used in place of dijkstra().
+    """
+    order, distance, previous = dijkstra_array(graph, root.index, maxcost)
+    epoch = graph.epoch
+    nodes = graph.graph
+    visited = dict()
+    goals = set()
+    for index in order:
+        node = nodes[index]
+        node.distance = distance[index]
+        prev = previous[index]
+        if prev >= 0:
+            # The previous node was visited first so its path_goal is set.
+            prevnode = nodes[prev]
+            node.previous = prevnode
+            node.path_goal = prevnode.path_goal + prevnode.goal
+        else:
+            node.previous = None
+            node.path_goal = 0
+        node.stamp = epoch
+        visited[node] = None
+        if node.goal:
+            goals.add(node)
+    return visited, goals
+
+
+# The implementations selectable by --search. All return the same result.
+SEARCHES = {
+    'heap': dijkstra,
+    'bucket': dijkstra_bucket,
+    'array': dijkstra_nodes,
+}
+
+
+def choose_goal(player: Player, graph: Graph) -> tuple[Node, int]:
     """
     Choose a player's next move:
     Iterate over possible destination nodes:
@@ -265,58 +693,78 @@ def choose_goal(player: Player, graph: Graph) -> Node:
     2. Is the destination node a goal node?
     3. Are there other goal nodes on the path to the destination node?
     4. Do I need to advance my train?
+
+    This is a single pass over the visited nodes: the search sets each
+    node's path_goal, and the train's advance is looked up in
+    player.TRAIN_ADVANCE. The multipliers are the player's weights. With
+    --searchcache, the search result is looked
+    up in _search_cache first, and the Nodes' distance and previous fields
+    aren't set if it is found.
     @Player player
     @Graph graph
+    @return: the chosen node and its distance from the truck
     """
     scores = []
-    graph.reset_graph()
     truck_node = player.truck_node
     maxcost = player.actions.movement
 
-    visited, goals = dijkstra(graph, truck_node, maxcost, verbose=_args.verbose)
+    search = SEARCHES[_args.search]
+    if _search_cache is None:
+        visited, goals = search(graph, truck_node, maxcost, verbose=_verbose)
+        candidates = ((node, node.distance, node.path_goal)
+                      for node in visited)
+    else:
+        key = (truck_node.index, maxcost, graph.board_hash)
+        result = _search_cache.get(key)
+        if result is None:
+            visited, goals = search(graph, truck_node, maxcost,
+                                    verbose=_verbose)
+            result = export_result(visited)
+            _search_cache.put(key, result)
+        candidates = zip(map(graph.graph.__getitem__, result.visited),
+                         result.distance, result.path_goal)
     # graph.print_board()
     # print(f'{visited=}')
     # print(f'{set(visited)=}')
     # sys.exit()
-    for node in visited:
-        score = 0
+    truck_col = truck_node.col
+    train_col = player.train_col
+    # train_cols[points]: the columns the train can move with points left
+    train_cols = TRAIN_ADVANCE[train_col]
+    goal_weight, column_weight, prev_goal_weight, train_weight = player.weights
+    best_node = None
+    best_distance = 0
+    best_score = -sys.maxsize
+    for node, distance, path_goal in candidates:
         # Increase the score for each column we move the truck
-        score += (node.col - truck_node.col) * config.TRUCK_COLUMN_MULTIPLIER
+        score = (node.col - truck_col) * column_weight
         # Increase the score if adjacent nodes have wells
-        score += node.goal * config.GOAL_MULTIPLIER
-        prevnode: Node = node.previous
-        examined = set()
-        while prevnode:
-            if prevnode in examined:
-                print(f'loop from {node}: {prevnode=}, {examined=}')
-                graph.print_board()
-                sys.exit()
-            examined.add(prevnode)
-            # print(f'{player.id=} {prevnode=}')
-            # Increase the score if a node on the path is a goal, but no extra
-            # if the node has more than one neighbor with wells
-            score += prevnode.goal * config.PREV_GOAL_MULTIPLER
-            prevnode = prevnode.previous
-        if player.train_col < node.col:
-            # Compute points available to move the train
-            points = maxcost - node.distance
-            # See how far we can move the train
-            train_dest = player.train_col
-            while (points_needed :=
-                   config.TRAIN_COSTS[train_dest + 1]) <= points:
-                points -= points_needed
-                train_dest += 1
-            # Increase the score for each column we can move the train.
-            cols = train_dest - player.train_col
-            score += cols * config.TRAIN_COLUMN_MULTIPLIER
-        scores.append((node, score))
-    scores.sort(key=lambda x: x[1])
+        score += node.goal * goal_weight
+        # Increase the score if a node on the path is a goal, but no extra
+        # if the node has more than one neighbor with wells
+        score += path_goal * prev_goal_weight
+        if train_col < node.col:
+            # Increase the score for each column we can move the train with
+            # the points left after moving the truck.
+            points = maxcost - distance
+            cols = (train_cols[points] if points < len(train_cols)
+                    else train_advance(train_col, points))
+            score += cols * train_weight
+        # On a tie, the last node visited wins.
+        if score >= best_score:
+            best_node = node
+            best_distance = distance
+            best_score = score
+        if _verbose >= 3:
+            scores.append((node, score))
     if _verbose >= 3:
+        scores.sort(key=lambda x: x[1])
         # slist = [(str(s[0]), s[1]) for s in scores]
         slist = ", ".join(["(" + str(s[0]) + ", " + str(s[1]) + ")" for s in scores])
-        trace(3, 'scores={}', slist)
-    trace(2, '{}->{}', truck_node, scores[-1][0])
-    return scores[-1][0]  # return the node with the highest score
+        trace3('scores={}', slist)
+    if _verbose >= 2:
+        trace2('{}->{}', truck_node, best_node)
+    return best_node, best_distance  # the node with the highest score
 
 
 def build_oilrig(player: Player):
@@ -328,7 +776,7 @@ def build_oilrig(player: Player):
     truck_node = player.truck_node
     if not truck_node.goal or not player.free_oil_rigs:
         return
-    sites = [n for n in truck_node.adjacent if n.wells and not n.derrick]
+    sites = truck_node.graph.sites.sites_next_to(truck_node)
     # Since node is a goal, at least one neighbor must have wells.
     assert sites
     # todo: Add heuristic for choosing site. For now just choose the first.
@@ -343,8 +791,8 @@ def build_oilrig(player: Player):
     player.rigs_in_use.append(site)
     player.free_oil_rigs -= 1
     site.add_derrick()
-    trace(2, 'player {}: {}, oil reserve: {}, cash now: {}, free rigs: {} ',
-          player, site, site.oil_reserve, player.cash, player.free_oil_rigs)
+    trace2('player {}: {}, oil reserve: {}, cash now: {}, free rigs: {} ',
+           player, site, site.oil_reserve, player.cash, player.free_oil_rigs)
 
 
 def transport_oil(player: Player, game: Game):
@@ -421,8 +869,9 @@ def transport_oil(player: Player, game: Game):
         # Move one oil marker to my tank at the selected oil company
         remove_marker_from_rig()
         player.storage_tanks[emptiest_tank] += 1
-    trace(2, 'Action 6: player {}, rigs, reserve {}', player.id,
-          [(str(n), n.oil_reserve) for n in player.rigs_in_use])
+    if _verbose >= 2:
+        trace2('Action 6: player {}, rigs, reserve {}', player.id,
+               [(str(n), n.oil_reserve) for n in player.rigs_in_use])
 
 
 def surrender_licenses(player: Player, required: int, game: Game):
@@ -438,10 +887,10 @@ def surrender_licenses(player: Player, required: int, game: Game):
         game.license_discards.append(license_card)
 
     if game.licenses_exhausted:
-        trace(2, 'Licenses not exhausted.')
+        trace2('Licenses not exhausted.')
         game.licenses_exhausted = False
     total_surrendered = required
-    trace(3, 'required = {}', required)
+    trace3('required = {}', required)
     if required % 2 == 1:  # if odd number of licenses needed
         if player.single_licenses:
             one_license(player.single_licenses)
@@ -510,17 +959,17 @@ def sell_oil(company: int, game: Game, player_list: list[Player]):
         return mybid
 
     bids: list = []
-    storage = []
-    for player in player_list:
-        storage.append(player.storage_tanks[company])
-    trace(2, 'company {}, storage: {}', company, storage)
+    if _verbose >= 2:
+        storage = [player.storage_tanks[company] for player in player_list]
+        trace2('company {}, storage: {}', company, storage)
     for player in player_list:
         bid = Bid(player, compute_bid())
-        trace(2, 'player {}, single/double licenses: {}/{}, '
-                 'total: {} bid: {}, price: ${}',
-              player.id, len(player.single_licenses),
-              len(player.double_licenses), player.nlicenses, bid.value,
-              game.selling_price[company])
+        if _verbose >= 2:
+            trace2('player {}, single/double licenses: {}/{}, '
+                   'total: {} bid: {}, price: ${}',
+                   player.id, len(player.single_licenses),
+                   len(player.double_licenses), player.nlicenses, bid.value,
+                   game.selling_price[company])
         if bid.value:
             bids.append(bid)
     # Find the highest bid (tie goes to first found)
@@ -544,106 +993,105 @@ def sell_oil(company: int, game: Game, player_list: list[Player]):
         # Get paid
         oil_units = player.storage_tanks[company]
         price = (game.selling_price[company] * oil_units)
-        trace(2, '    player {} sells {} units to company {} for ${}',
-              player.id, oil_units, company, price)
-        trace(2, '     licenses used: {}, {} remaining ', next_highest,
-              player.nlicenses)
+        if _verbose >= 2:
+            trace2('    player {} sells {} units to company {} for ${}',
+                   player.id, oil_units, company, price)
+            trace2('     licenses used: {}, {} remaining ', next_highest,
+                   player.nlicenses)
         player.cash += price
         player.storage_tanks[company] = 0
 
 
-def one_turn(turn: int, playerlist: list[Player], game: Game):
+def take_card(player: Player, action_cards: list, cardn: int, game: Game):
     """
-    @param turn: for debug
-    @param playerlist:
+    Give a player one of the action cards drawn this turn.
+    @param player:
+    @param action_cards: the cards not yet taken this turn
+    @param cardn: the index of the player's card in action_cards
     @param game:
-    @return: True if game ended else None
+    @return: None. The card is removed from action_cards and discarded.
     """
-
-    # Action 1: Change the selling price
-    for company in range(config.NCOMPANIES):
-        oil_price.set_price(game.selling_price, company)
-
-    # Action 2: Take action cards
-    action_cards = []
-    red_card = draw_card(game.red_action_cards, game.red_discards)
-    action_cards.append(red_card)
-
-    # Action 2a: Move black train
-    if game.move_black_train(red_card.black_loco):
-        return True  # game ended
-    for i in range(len(game.players)):
-        beige_card = draw_card(game.beige_action_cards, game.beige_discards)
-        action_cards.append(beige_card)
-
-    # Each player selects one action card, starting with starting_player
-    trace(config.TR_ACTION_CARDS, 'Turn: {}, players {}, price: {}, black train col: {} ',
-          turn, playerlist, game.selling_price, game.black_train_col)
-    for player in playerlist:
-
-        # todo: Heuristic needed to select the best action card.
-        cardn = random.randrange(len(action_cards))
-        card = action_cards[cardn]
-
-        if isinstance(card, config.RedActionCard):  # Selected the red card
-            nlicenses = red_card.nlicenses
-            movement = red_card.movement
-            markers = red_card.markers
-            backwards = red_card.backwards
-            oilprice = 0
-            game.red_discards.append(card)
-        else:  # Selected one of the beige cards
-            card = action_cards[cardn]
-            nlicenses = card.nlicenses
-            movement = card.movement
-            oilprice = card.oilprice
-            markers = backwards = 0
-            game.beige_discards.append(card)
-        del action_cards[cardn]
-        player.set_actions(nlicenses, movement, markers, backwards, oilprice)
+    card = action_cards[cardn]
+    if isinstance(card, config.RedActionCard):  # Selected the red card
+        nlicenses = card.nlicenses
+        movement = card.movement
+        markers = card.markers
+        backwards = card.backwards
+        oilprice = 0
+        game.red_discards.append(card)
+    else:  # Selected one of the beige cards
+        nlicenses = card.nlicenses
+        movement = card.movement
+        oilprice = card.oilprice
+        markers = backwards = 0
+        game.beige_discards.append(card)
+    del action_cards[cardn]
+    player.set_actions(nlicenses, movement, markers, backwards, oilprice)
+
+
+def finish_turn(playerlist: list[Player], game: Game, action_cards: list):
+    """
+    Play Actions 3 to 8 once every player has taken an action card.
+    @param playerlist: the players in turn order
+    @param game:
+    @param action_cards: the cards not taken, to be discarded
+    @return: None
+    """
+    if _timing:
+        start = time.perf_counter_ns()
 
     # Action 3: Hand out licenses
     for player in game.players:
         deal_licenses(player, game)
+    if _timing:
+        start = add_time(PHASES[2], start)
 
     # Action 4 Move the truck and locomotive and do special actions
 
     for player in playerlist:
-        nextnode: Node = choose_goal(player, game.graph)
-        trace(2, 'Action 4: player {}, truck_node: {} —> {} {}, licenses: '
-              '{}, cash: ${}',
-              player, player.truck_node, str(nextnode),
-              player.actions, player.nlicenses, player.cash)
+        nextnode, distance = choose_goal(player, game.graph)
+        trace2('Action 4: player {}, truck_node: {} —> {} {}, licenses: '
+               '{}, cash: ${}',
+               player, player.truck_node, str(nextnode),
+               player.actions, player.nlicenses, player.cash)
         if nextnode.goal:
             nextnode.goal_reached = True
         # todo: Examine goal nodes en route to this node
         # 4a: Placing and moving trucks
-        player.truck_node.truck = None
-        nextnode.truck = player
+        player.truck_node.set_truck(None)
+        nextnode.set_truck(player)
         player.truck_node = nextnode
-        player.truck_hist.append(str(nextnode))
+        player.truck_hist.append(hist_entry(nextnode))
 
         # 4b: Searching for Oil
         # This is handled in choose_goal() which peeks at sites if allowed
 
         # 4c: Moving your own locomotive
-        if nextnode.distance < player.actions.movement:
-            player.advance_train(_verbose)
+        if distance < player.actions.movement:
+            player.advance_train(distance, _verbose)
 
-        trace(2, '          traincol: {}, goal: {}, truck@{}',
-              player.train_col, nextnode.goal, nextnode)
+        trace2('          traincol: {}, goal: {}, truck@{}',
+               player.train_col, nextnode.goal, nextnode)
+    if _timing:
+        start = add_time(PHASES[3], start)
 
     # Action 5: Building Oilrigs
     for player in playerlist:
         build_oilrig(player)
+    if _timing:
+        start = add_time(PHASES[4], start)
 
     # Action 6: Drilling and transporting the oil
     for player in playerlist:
         transport_oil(player, game)
+    if _timing:
+        start = add_time(PHASES[5], start)
 
     # Action 7: Selling oil
     for company in range(config.NCOMPANIES):
         sell_oil(company, game, playerlist)
+    if _timing:
+        start = add_time(PHASES[6], start)
 
     # Action 8: Storage tank limitations
     for player in playerlist:
@@ -662,8 +1110,178 @@ def one_turn(turn: int, playerlist: list[Player], game: Game):
             game.beige_discards.append(card)
     trace(config.TR_ACTION_CARDS, 'beige cards/discards: {}/{}', len(game.beige_action_cards),
           len(game.beige_discards))
-    if _args.short:
-        return True
+    if _timing:
+        add_time(PHASES[7], start)
+
+
+def one_turn(turn: int, playerlist: list[Player], game: Game, search=True):
+    """
+    @param turn: for debug
+    @param playerlist:
+    @param game:
+    @param search: False in a rollout, where the cards are chosen at random
+    @return: True if game ended else None
+    """
+    if _timing:
+        start = time.perf_counter_ns()
+
+    # Action 1: Change the selling price
+    for company in range(config.NCOMPANIES):
+        oil_price.set_price(game.selling_price, company)
+    if _timing:
+        start = add_time(PHASES[0], start)
+
+    # Action 2: Take action cards
+    action_cards = []
+    red_card = draw_card(game.red_action_cards, game.red_discards)
+    action_cards.append(red_card)
+
+    # Action 2a: Move black train
+    if game.move_black_train(red_card.black_loco):
+        if _timing:
+            add_time(PHASES[1], start)
+        return True  # game ended
+    for i in range(len(game.players)):
+        beige_card = draw_card(game.beige_action_cards, game.beige_discards)
+        action_cards.append(beige_card)
+
+    # Each player selects one action card, starting with starting_player
+    trace(config.TR_ACTION_CARDS, 'Turn: {}, players {}, price: {}, black train col: {} ',
+          turn, playerlist, game.selling_price, game.black_train_col)
+    for n, player in enumerate(playerlist):
+        if search and player.id in _mcts_players:
+            cardn = select_card(turn, playerlist, n, action_cards, game)
+        else:
+            cardn = random.randrange(len(action_cards))
+        take_card(player, action_cards, cardn, game)
+    if _timing:
+        add_time(PHASES[1], start)
+
+    finish_turn(playerlist, game, action_cards)
+
+
+def player_value(player: Player):
+    """
+    Estimate what a player's position is worth before the game ends: the
+    cash plus the oil in the rigs and tanks at the end-of-game price.
+    """
+    markers = sum(player.storage_tanks)
+    for node in player.rigs_in_use:
+        markers += node.oil_reserve
+    return player.cash + config.GAME_END_MARKER_PRICE * markers
+
+
+def rollout(turn: int, playerlist: list[Player], n: int, action_cards: list,
+            cardn: int, game: Game):
+    """
+    Play on from the choice of a card by playerlist[n] with the cards of the
+    later players chosen at random and the usual heuristics for the moves,
+    for --rolloutdepth turns or until the game ends. The game is changed;
+    the caller restores it.
+    @param turn: the current turn
+    @param playerlist: the players in turn order
+    @param n: the index in playerlist of the player choosing a card
+    @param action_cards: the cards not yet taken this turn
+    @param cardn: the index of the card to try
+    @param game:
+    @return: the fraction of the opponents the player beats, a tie counting
+             as half
+    """
+    player = playerlist[n]
+    action_cards = action_cards[:]
+    take_card(player, action_cards, cardn, game)
+    for other in playerlist[n + 1:]:
+        take_card(other, action_cards, random.randrange(len(action_cards)),
+                  game)
+    finish_turn(playerlist, game, action_cards)
+    nplayers = game.nplayers
+    starting = playerlist[0].id
+    for _ in range(_args.rolloutdepth):
+        # The next starting player, as in play_game()
+        starting += 1
+        if starting == nplayers:
+            starting = 0
+            turn += 1
+        playerlist = game.players[starting:] + game.players[:starting]
+        if one_turn(turn, playerlist, game, search=False):
+            compute_score(playerlist)
+            values = [p.cash for p in game.players]
+            break
+    else:
+        values = [player_value(p) for p in game.players]
+    value = values[player.id]
+    beaten = sum(1 if value > v else 0.5 if value == v else 0
+                 for v in values)
+    return (beaten - 0.5) / (nplayers - 1)  # less the tie with itself
+
+
+def select_card(turn: int, playerlist: list[Player], n: int,
+                action_cards: list, game: Game):
+    """
+    Choose an action card for playerlist[n] by Monte Carlo tree search one
+    level deep: each different card is an arm of a UCB1 bandit, and playing
+    an arm is a rollout() from a snapshot of the game. Before each rollout
+    the hidden information, the order of the draw piles and the oil under
+    the unbuilt tiles, is shuffled. The budget is --rollouts rollouts or,
+    if given, --rollouttime seconds. The random state is restored after the
+    search, so the rest of the game draws the same numbers whatever the
+    budget.
+    @param turn: the current turn
+    @param playerlist: the players in turn order
+    @param n: the index in playerlist of the player choosing a card
+    @param action_cards: the cards not yet taken this turn
+    @param game:
+    @return: the index in action_cards of the most visited card
+    """
+    arms = []
+    cards = set()
+    for cardn, card in enumerate(action_cards):
+        if (type(card), card) not in cards:
+            cards.add((type(card), card))
+            arms.append(cardn)
+    if len(arms) == 1:
+        return arms[0]
+    global _timing
+    snapshot = game.snapshot()
+    random_state = random.getstate()
+    verbose = _verbose
+    set_verbose(0)
+    # The rollouts are timed as part of the card draw, not as turns.
+    timing = _timing
+    _timing = False
+    narms = len(arms)
+    visits = [0] * narms
+    rewards = [0.0] * narms
+    deadline = (time.perf_counter() + _args.rollouttime
+                if _args.rollouttime else None)
+    nrollouts = 0
+    try:
+        while (nrollouts < _args.rollouts if deadline is None
+               else time.perf_counter() < deadline):
+            if nrollouts < narms:
+                arm = nrollouts
+            else:
+                log_n = math.log(nrollouts)
+                arm = max(range(narms), key=lambda a: (
+                    rewards[a] / visits[a] + config.MCTS_EXPLORATION
+                    * math.sqrt(log_n / visits[a])))
+            game.determinize()
+            rewards[arm] += rollout(turn, playerlist, n, action_cards,
+                                    arms[arm], game)
+            visits[arm] += 1
+            nrollouts += 1
+            game.restore(snapshot)
+    finally:
+        set_verbose(verbose)
+        _timing = timing
+        random.setstate(random_state)
+    best = max(range(narms), key=visits.__getitem__)
+    if _verbose >= 2:
+        trace2('player {}: {} rollouts, card {}, visits {}, mean rewards {}',
+               playerlist[n], nrollouts, action_cards[arms[best]], visits,
+               [round(r / v, 3) if v else None
+                for r, v in zip(rewards, visits)])
+    return arms[best]
 
 
 def compute_score(playerlist: list[Player]):
@@ -722,7 +1340,10 @@ def play_game(game):
                 playern += 1
                 if playern >= game.nplayers:
                     playern = 0
-            game_ended = one_turn(turn, playerlist, game)
+            # With --short, stop after the first player's turn. This is
+            # checked here rather than in one_turn() so that a rollout()
+            # still plays on to --rolloutdepth or the end of the game.
+            game_ended = one_turn(turn, playerlist, game) or _args.short
             if _verbose >= 2:
                 game.audit_licenses()
             if game_ended:
@@ -737,16 +1358,202 @@ def play_game(game):
     trace(config.TR_FINAL_PATH,
           f'Game ended. Elapsed: {elapsed:5.4f} seconds, '
           f'{game.black_train_col=}, {winners=}')
-    for player in game.players:
-        trace(config.TR_FINAL_PATH,
-              'Player {} cash = ${}, path = {}',
-              player.id, player.cash, player.truck_hist)
+    if _verbose >= config.TR_FINAL_PATH:
+        for player in game.players:
+            trace(config.TR_FINAL_PATH,
+                  'Player {} cash = ${}, path = {}',
+                  player.id, player.cash, player.truck_path())
     return winners
 
 
+def game_seed(ngame):
+    """
+    Derive the seed for one game from the base seed and the game number so
+    that a game plays the same way whichever process it runs in.
+    @param ngame: the game number
+    @return: a seed acceptable to random.seed()
+    """
+    return f'{_seed}:{ngame}'
+
+
+def pooled_graph(nplayers) -> Graph:
+    """
+    The board is parsed once per number of players. After that, the Graph
+    is reset and reused, so only one game at a time can use it.
+    @param nplayers:
+    @return: a Graph of _rawboard ready for a new game
+    """
+    graph = _graphs.get(nplayers)
+    if graph is None:
+        graph = _graphs[nplayers] = Graph(_rawboard, nplayers)
+    else:
+        graph.reset()
+    return graph
+
+
+def new_game(ngame, weights=None) -> Game:
+    """
+    @param ngame: the game number
+    @param weights: a config.Weights for each player; the default is those
+                    given by --weights
+    """
+    random.seed(game_seed(ngame))
+    trace3("game # {}", ngame)
+    if weights is None:
+        weights = player_weights(_args)
+    return Game(pooled_graph(_nplayers), _nplayers, weights)
+
+
+def player_weights(args):
+    """
+    @return: the list of the config.Weights of each player given by
+             --weights, the players after those given getting
+             config.DEFAULT_WEIGHTS, or None if --weights isn't given
+    """
+    if not args.weights:
+        return None
+    weights = [config.Weights(*w) for w in args.weights]
+    return weights + [config.DEFAULT_WEIGHTS] * (args.nplayers - len(weights))
+
+
+def play_one(ngame):
+    """
+    Called in a worker process when --workers is greater than one.
+    @param ngame: the game number
+    @return: the list of winners of the game and, for --phasetimes, the
+             times returned by take_times() and, for --searchcache, the
+             counts returned by SearchCache.take_counts()
+    """
+    winners = play_game(new_game(ngame))
+    return (winners, take_times() if _timing else None,
+            _search_cache.take_counts() if _search_cache is not None
+            else None)
+
+
+def mcts_players(args):
+    """
+    @return: the ids of the players that choose their action cards by
+             select_card(), none unless a rollout budget is given
+    """
+    if args.rollouts or args.rollouttime:
+        return frozenset(args.mctsplayers)
+    return frozenset()
+
+
+def make_search_cache(args):
+    """
+    @return: a SearchCache of --searchcache megabytes, or None if it isn't
+             given
+    """
+    if args.searchcache:
+        return SearchCache(args.searchcache * 2**20)
+    return None
+
+
+def init_worker(args, rawboard, seed):
+    """
+    Set the module globals in a worker process. They are normally set when
+    this module is run as the main program, which isn't the case in a worker
+    that was spawned rather than forked.
+    """
+    global _args, _maxcost, _mcts_players, _nplayers, _rawboard, _seed
+    global _search_cache
+    _args = args
+    _maxcost = args.maxcost
+    _mcts_players = mcts_players(args)
+    _search_cache = make_search_cache(args)
+    set_verbose(args.verbose)
+    set_timing(args.phasetimes)
+    _nplayers = args.nplayers
+    _rawboard = rawboard
+    _graphs.clear()
+    _seed = seed
+
+
+def play_games(graph):
+    """
+    Play _args.games games, either in this process or spread over a pool of
+    _args.workers processes. Each game is seeded from its game number so the
+    totals are the same whatever the number of workers. With --tolerance,
+    stop as soon as the win rates are settled (see sequential.py); the games
+    are then counted in order so that the same games are used whatever the
+    number of workers.
+    @param graph: returned unchanged if the games are played by workers.
+    @return: the graph of the last game played in this process
+    """
+    winners = [0 for _n in range(_args.nplayers)]
+    ties = 0
+    hits = misses = 0  # the search cache counts of the workers
+    rates = None
+    if _args.tolerance:
+        rates = WinRates(_args.nplayers, _args.confidence, _args.difference)
+
+    def tally(winnerlist):
+        """
+        @return: True if the games can stop
+        """
+        nonlocal ties
+        if winnerlist is None:  # stopped by --turns
+            return False
+        for w in winnerlist:
+            winners[w] += 1
+        if len(winnerlist) > 1:
+            ties += 1
+        if rates is None:
+            return False
+        rates.add(winnerlist)
+        return rates.settled(_args.tolerance, _args.mingames)
+
+    starttime = time.perf_counter()
+    if _args.workers > 1:
+        # The input file can't be pickled and the workers don't need it.
+        args = argparse.Namespace(**vars(_args))
+        args.incsv = None
+        chunksize = max(1, _args.games // (_args.workers * 8))
+        if rates is not None:
+            # Smaller chunks waste less work past the stopping point.
+            chunksize = min(chunksize, 16)
+        with multiprocessing.Pool(_args.workers, initializer=init_worker,
+                                  initargs=(args, _rawboard, _seed)) as pool:
+            imap = pool.imap if rates is not None else pool.imap_unordered
+            for winnerlist, times, counts in imap(
+                    play_one, range(_args.games), chunksize):
+                if times:
+                    merge_times(times)
+                if counts:
+                    hits += counts[0]
+                    misses += counts[1]
+                if tally(winnerlist):
+                    break
+    else:
+        for ngame in range(_args.games):
+            game = new_game(ngame)
+            graph = game.graph
+            if tally(play_game(game)):
+                break
+    elapsed = time.perf_counter() - starttime
+    print(f'{ties=}, {winners=}, {elapsed=:6.3f}')
+    if rates is not None:
+        rates.report(_args.tolerance, _args.mingames, _args.games)
+    if _search_cache is not None:
+        if _args.workers > 1:
+            print(f'search cache: {hits=}, {misses=}, '
+                  f'hit rate {100 * hits / max(1, hits + misses):.1f}%')
+        else:
+            hits, misses = _search_cache.hits, _search_cache.misses
+            print(f'search cache: {hits=}, {misses=}, '
+                  f'hit rate {100 * hits / max(1, hits + misses):.1f}%, '
+                  f'{len(_search_cache)} entries, '
+                  f'{_search_cache.nbytes / 2**20:.1f} MB')
+    if _timing:
+        print_times()
+    return graph
+
+
 def main():
-    rawboard = read_board(_args.incsv)
-    graph = Graph(rawboard, _args.nplayers)
+    global _rawboard, _seed
+    _rawboard = load_board(_args.incsv)
+    graph = pooled_graph(_args.nplayers)
     if _args.dumprawboard:
         graph.dump_raw_board(_args.dumprawboard)
     if _verbose >= 3:
@@ -757,28 +1564,17 @@ def main():
         print(f'root: <{_args.row},{_args.column}> {nrows=} {ncols=}'
               f' maxcost: {str(m) if m < sys.maxsize else "∞"}')
     if _args.timeit:
-        time_dijkstra(graph, dijkstra, _args)
+        compare_searches.compare(graph, SEARCHES, _args.timeit,
+                                 seed=_args.seed)
     elif _args.dijkstra:
-        one_dijkstra(graph, dijkstra, _args, _verbose)
+        one_dijkstra(graph, SEARCHES[_args.search], _args, _verbose)
         # print("*** returned from one_dijkstra")
     else:
-        winners = [0 for _n in range(_args.nplayers)]
-        ties = 0
-        random.seed(config.RANDOM_SEED)
-        starttime = time.process_time()
-        for ngame in range(_args.games):
-            trace(3, "game # {}", ngame)
-            graph = Graph(rawboard, _args.nplayers)
-            game = Game(graph, _nplayers)
-            winnerlist = play_game(game)
-            for w in winnerlist:
-                winners[w] += 1
-            if len(winnerlist) > 1:
-                ties += 1
-            # print(f'{winnerlist=}')
-
-        elapsed = time.process_time() - starttime
-        print(f'{ties=}, {winners=}, {elapsed=:6.3f}')
+        _seed = _args.seed
+        if _seed is None:
+            _seed = random.randrange(sys.maxsize)
+        trace2('seed: {}', _seed)
+        graph = play_games(graph)
     if _args.verbose >= 3:
         graph.dump_board()
     # print(board)
@@ -786,19 +1582,38 @@ def main():
         graph.print_board()
 
 
-def getargs():
+def getargs(argv=None):
+    """
+    @param argv: the arguments to parse instead of sys.argv[1:], for example
+                 when this module is driven by benchmark.py
+    """
     parser = argparse.ArgumentParser(
         description='''
         Play the game giganten.
         ''')
     parser.add_argument('incsv', type=argparse.FileType('r'), help='''
          The file containing the board description.''')
+    parser.add_argument('--boardcache', action='store_true', help='''
+    Load the board from a compiled copy written next to the CSV file,
+    creating it, or recreating it if the CSV file has changed. The CSV file
+    is only read again if its size or modification time has changed; see
+    --verifycache.
+    ''')
     parser.add_argument('--bycols', action='store_true', help='''
     The input CSV file contains data by columns and needs to be flipped.
     ''')
     parser.add_argument('-c', '--column', type=int, default=0, help='''
     Start column. For testing.
     ''')
+    parser.add_argument('--confidence', type=float, help='''
+    The confidence level of the intervals for --tolerance. The default is
+    0.95.
+    ''')
+    parser.add_argument('--difference', type=int, nargs=2,
+                        metavar=('A', 'B'), help='''
+    With --tolerance, stop on the interval of the difference between the win
+    rates of players A and B instead of on every player's win rate.
+    ''')
     parser.add_argument('--dumprawboard', help='''
     Specify the file to dump the raw board to. Useful if the input is by
     columns. The output raw board is by rows.
@@ -814,20 +1629,65 @@ def getargs():
                         help='''
     Maximum distance of interest. For testing.
     ''')
+    parser.add_argument('--mctsplayers', type=int, nargs='+', default=[0],
+                        help='''
+    The ids of the players that choose their action cards by Monte Carlo tree
+    search if --rollouts or --rollouttime is given. The default is 0.''')
+    parser.add_argument('--mingames', type=int, help='''
+    The number of games to play before --tolerance can stop the games. The
+    default is 100.
+    ''')
     parser.add_argument('-n', '--nplayers', default=4, type=int, help='''
     Specify the number of players; the default is 4.
     ''')
+    parser.add_argument('--phasetimes', action='store_true', help='''
+    Time the phases of each turn, choose_goal and the searches over all the
+    games and print a table of the totals at the end.''')
     parser.add_argument('-p', '--print', action='store_true', help='''
     Print the finished board with distances.
     ''')
     parser.add_argument('-r', '--row', type=int, default=0, help='''
     Start row. For testing.
     ''')
+    parser.add_argument('--rollouts', type=int, default=0, help='''
+    The number of rollouts for each choice of an action card by the
+    --mctsplayers. The default is 0: all players choose at random.''')
+    parser.add_argument('--rolloutdepth', type=int, default=8, help='''
+    The number of turns played in a rollout after the turn in which the card
+    is chosen, unless the game ends first. The default is 8.''')
+    parser.add_argument('--rollouttime', type=float, help='''
+    The wall time in seconds for each choice of an action card by the
+    --mctsplayers, instead of a number of --rollouts.''')
+    parser.add_argument('--search', choices=SEARCHES, default='heap',
+                        help='''
+    The shortest path implementation to use. They all give the same result.
+    Default is heap.
+    ''')
+    parser.add_argument('--searchcache', type=float, default=0, help='''
+    Cache the results of the searches by the truck, the movement points and
+    the blocked and built nodes, keeping at most about this many megabytes of
+    them in each process, and report the hits and misses. See
+    search_cache.py. The default is 0, no cache.
+    ''')
+    parser.add_argument('--seed', type=int, default=config.RANDOM_SEED,
+                        help='''
+    The base random seed. Each game is seeded from this and its game number.
+    If not specified, a seed is chosen at random.
+    ''')
     parser.add_argument('-s', '--short', action='store_true', help='''
     Stop after one turn.
     ''')
     parser.add_argument('--timeit', type=int, help='''
-    Time the dijkstra function with this number of iterations.
+    Check that every shortest path implementation, the --search choices,
+    dijkstra.EdgeGraph and shortest_path.dijkstra, finds the same distances
+    from this number of random roots, then time them. See
+    compare_searches.py.
+    ''')
+    parser.add_argument('--tolerance', type=float, help='''
+    Stop before --games games once the confidence interval of every
+    player's win rate, or of the --difference, is within plus or minus this
+    much, and report the intervals and the number of games played. See
+    sequential.py.
     ''')
     parser.add_argument('-t', '--turns', type=int, default=sys.maxsize, help='''
     Stop the game after this many turns.
@@ -835,9 +1695,51 @@ def getargs():
     parser.add_argument('-v', '--verbose', default=1, type=int, help='''
     Modify verbosity.
     ''')
-    args = parser.parse_args()
+    parser.add_argument('--verifycache', action='store_true', help='''
+    With --boardcache, compare the SHA-256 of the CSV file with the one
+    recorded in the compiled copy even if the file's size and modification
+    time are unchanged.
+    ''')
+    parser.add_argument('--weights', type=float, nargs=4, action='append',
+                        metavar=('GOAL', 'COLUMN', 'PREV_GOAL', 'TRAIN'),
+                        help=f'''
+    The weights choose_goal gives to the goal count of a destination, the
+    columns the truck moves, the goals on the path and the columns the train
+    can move with the points left. Give the option once for each player in
+    order; the players after those get config.DEFAULT_WEIGHTS,
+    {' '.join(map(str, config.DEFAULT_WEIGHTS))}. See tune_weights.py.
+    ''')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='''
+    Number of processes to play the games in. Default is 1, meaning play
+    them all in this process.
+    ''')
+    args = parser.parse_args(argv)
     if args.dijkstra:
         args.print = True
+    if (args.rollouts or args.rollouttime) and args.nplayers < 2:
+        parser.error('--rollouts and --rollouttime need at least 2 players.')
+    if not set(args.mctsplayers) <= set(range(args.nplayers)):
+        parser.error(f'--mctsplayers needs players in 0 to '
+                     f'{args.nplayers - 1}.')
+    if args.tolerance is None:
+        given = [option for option, value in
+                 (('--confidence', args.confidence),
+                  ('--difference', args.difference),
+                  ('--mingames', args.mingames)) if value is not None]
+        if given:
+            parser.error(f'--tolerance is needed by {", ".join(given)}.')
+    if args.confidence is None:
+        args.confidence = 0.95
+    if args.mingames is None:
+        args.mingames = 100
+    if args.difference:
+        a, b = args.difference
+        if a == b or not {a, b} <= set(range(args.nplayers)):
+            parser.error(f'--difference needs two different players in 0 to '
+                         f'{args.nplayers - 1}.')
+    if args.weights and len(args.weights) > args.nplayers:
+        parser.error(f'--weights is given {len(args.weights)} times for '
+                     f'{args.nplayers} players.')
     return args
 
 
@@ -848,7 +1750,10 @@ if __name__ == '__main__':
         sys.argv.append('-h')
     _args = getargs()
     _maxcost = _args.maxcost
-    _verbose = _args.verbose
+    _mcts_players = mcts_players(_args)
+    _search_cache = make_search_cache(_args)
+    set_verbose(_args.verbose)
+    set_timing(_args.phasetimes)
     _nplayers = _args.nplayers
     if _verbose > 1:
         print(f'verbosity: {_args.verbose}')
@@ -1,21 +1,202 @@
 """
 
 """
+from collections import namedtuple
 from colorama import Fore, Style
+import random
 import re
 import sys
 
 from node import Node
+from site_index import SiteIndex
 
 LEFTWARDS_ARROW = '\u2190'
 UPWARDS_ARROW = '\u2191'
 RIGHTWARDS_ARROW = '\u2192'
 DOWNWARDS_ARROW = '\u2193'
 
+# See giganten.read_board() for a description of the pattern
+CELL_PATTERN = re.compile(r'(\d?)(\.(\d?)([xd]?))?')
+# Values of ParsedBoard.variant
+NO_VARIANT = 0
+VARIANT_X = 1  # a cell ignored for 3-person games
+VARIANT_D = 2  # a cell containing a derrick (used for testing)
+VARIANTS = {'': NO_VARIANT, 'x': VARIANT_X, 'd': VARIANT_D}
+
+"""
+    The board with each cell parsed. All but rows and columns are flat
+    sequences in row order, indexed like Graph.graph:
+
+    terrain, wells, variant: from the cells; variant is one of NO_VARIANT,
+        VARIANT_X or VARIANT_D.
+    adj_start, adj_index: the neighbors of cell i are
+        adj_index[adj_start[i]:adj_start[i + 1]]; see grid_adjacency().
+    cells: the cell strings, or None if the board was loaded from a compiled
+        copy (see board_cache.py).
+"""
+ParsedBoard = namedtuple('ParsedBoard', 'rows columns terrain wells variant '
+                                        'adj_start adj_index cells')
+
+
+def grid_adjacency(nrows, ncols):
+    """
+    :return: adj_start, adj_index as described in ParsedBoard. Each cell's
+             neighbors are in the order up, left, down, right, which the
+             searches rely on to break ties.
+    """
+    adj_start = [0]
+    adj_index = []
+    for r in range(nrows):
+        for c in range(ncols):
+            index = r * ncols + c
+            if r > 0:
+                adj_index.append(index - ncols)
+            if c > 0:
+                adj_index.append(index - 1)
+            if r < nrows - 1:
+                adj_index.append(index + ncols)
+            if c < ncols - 1:
+                adj_index.append(index + 1)
+            adj_start.append(len(adj_index))
+    return adj_start, adj_index
+
+
+def parse_board(rawboard):
+    """
+    :param rawboard: the list of rows of cell strings from
+                     giganten.read_board()
+    :return: a ParsedBoard
+    """
+    nrows = len(rawboard)
+    ncols = len(rawboard[0])
+    terrain = []
+    wells = []
+    variant = []
+    cells = []
+    for r, row in enumerate(rawboard):
+        for c, cell in enumerate(row):
+            m = CELL_PATTERN.match(cell.lower())
+            # print(f'{r=} {c=} {m.group(1,2,3,4)=}')
+            if m is None:
+                raise ValueError(
+                    f"In row {r}, col {c}, '{cell}' failed match.")
+            terrain.append(1 if m.group(1) == '' else int(m.group(1)))
+            wells.append(int(m.group(3)) if m.group(3) else 0)
+            variant.append(VARIANTS[m.group(4) or ''])
+            cells.append(cell)
+    adj_start, adj_index = grid_adjacency(nrows, ncols)
+    return ParsedBoard(nrows, ncols, terrain, wells, variant, adj_start,
+                       adj_index, cells)
+
+
+def format_cell(terrain, wells, variant):
+    """
+    :return: the cell string for a cell, the inverse of parse_board()
+    """
+    if not wells and not variant:
+        return str(terrain)
+    return (('' if terrain == 1 else str(terrain)) + '.'
+            + (str(wells) if wells else '') + ' xd'[variant].strip())
+
+
+class Topology:
+    """
+    The part of a board that is the same in every game with a given number
+    of players. It is built once and shared by every Graph made from it, so
+    that a Graph holds only the state of one game. All the sequences are
+    tuples indexed by Node.index:
+
+    terrain, adj_start, adj_index, cells: as in ParsedBoard; the cells are
+        formatted if the board was loaded from a compiled copy.
+    wells, derrick, goal: the state of the nodes before a game starts. The
+        "x" cells have no wells in a 3-player game.
+    blocked, adj_passable: the starting values of the Graph arrays.
+    volatile: the indices of the nodes whose wells, derrick, goal, oil
+        reserve or goal reached can change during a game: those with wells
+        and their neighbors.
+    blocked_keys, built_keys: the random 64-bit keys of a Zobrist hash of
+        what the searches depend on (see Graph.board_hash): a node's
+        blocked_key if it is blocked and its built_key if a derrick has been
+        built on it, whether or not it has since been removed.
+    node_hash: a dict of index: the node's part of the hash before a game
+        starts, for the nodes where it isn't 0.
+    sites: the indices of the nodes with wells, the drill sites.
+    site_goals: a dict of the index of each site: the tuple of the indices
+        of its neighbors without wells, its goal cells.
+    """
+    __slots__ = ('nplayers', 'rows', 'columns', 'terrain', 'adj_start',
+                 'adj_index', 'cells', 'wells', 'derrick', 'goal', 'blocked',
+                 'adj_passable', 'volatile', 'blocked_keys', 'built_keys',
+                 'node_hash', 'sites', 'site_goals')
+
+    def __init__(self, parsed, nplayers):
+        """
+        :param parsed: a ParsedBoard or a board_cache.CompiledBoard
+        :param nplayers: the number of players
+        """
+        three_players = nplayers == 3
+        self.nplayers = nplayers
+        self.rows = parsed.rows
+        self.columns = parsed.columns
+        nnodes = self.rows * self.columns
+        self.terrain = tuple(parsed.terrain)
+        self.adj_start = adj_start = tuple(parsed.adj_start)
+        self.adj_index = adj_index = tuple(parsed.adj_index)
+        cells = parsed.cells
+        variants = parsed.variant
+        self.cells = tuple(cells) if cells else tuple(
+            format_cell(*cell) for cell in zip(parsed.terrain, parsed.wells,
+                                                variants))
+        self.wells = wells = tuple(
+            0 if variant == VARIANT_X and three_players else nwells
+            for nwells, variant in zip(parsed.wells, variants))
+        # For testing, force a derrick
+        self.derrick = derrick = tuple(variant == VARIANT_D
+                                       for variant in variants)
+        adjacent = [adj_index[adj_start[i]:adj_start[i + 1]]
+                    for i in range(nnodes)]
+        self.sites = tuple(i for i in range(nnodes) if wells[i])
+        self.site_goals = {i: tuple(j for j in adjacent[i] if wells[j] == 0)
+                           for i in self.sites}
+        goal = [0] * nnodes
+        for i in range(nnodes):
+            if wells[i] and not derrick[i]:
+                for j in adjacent[i]:
+                    # If the neighbor has wells, you aren't allowed to stop
+                    # there, so it can't be a goal.
+                    if wells[j] == 0:
+                        goal[j] += 1
+        self.goal = tuple(goal)
+        self.blocked = tuple(int(d) for d in derrick)
+        self.adj_passable = tuple(tuple(j for j in adj if not derrick[j])
+                                  for adj in adjacent)
+        self.volatile = tuple(i for i in range(nnodes) if wells[i] or any(
+            wells[j] for j in adjacent[i]))
+        # A private generator, so that the hash is the same in every process
+        # and the games' random numbers are untouched.
+        rnd = random.Random('zobrist')
+        self.blocked_keys = tuple(rnd.getrandbits(64) for _ in range(nnodes))
+        self.built_keys = tuple(rnd.getrandbits(64) for _ in range(nnodes))
+        self.node_hash = {i: self.blocked_keys[i] ^ self.built_keys[i]
+                          for i in range(nnodes) if derrick[i]}
+
 
 class Graph:
     # board - hold the array[rows, cols] of Node instances
     # graph - a 1d list of the Nodes, easier to iterate over.
+    # topology - the Topology shared with the other Graphs of the board.
+    # terrain, wells, blocked, adj_start, adj_index, adj_passable - flat
+    #   sequences indexed by Node.index for searching the board without
+    #   touching the Nodes. See reset().
+    # epoch - incremented by new_search(). A Node's distance and previous
+    #   are current only if its stamp equals the epoch.
+    # volatile - the nodes of Topology.volatile. See snapshot_nodes().
+    # sites - the SiteIndex of the open drill sites, kept up to date by
+    #   update_node().
+    # board_hash - a hash of the blocked nodes and the nodes where derricks
+    #   have been built, which together determine the result of a search
+    #   from a given root with a given maxcost. See Topology and
+    #   update_node().
     # for print_board: 0->illegal 1->flat 2->hilly 3->mountain
     GREEN = Fore.GREEN
     YELLOW = Fore.YELLOW
@@ -30,50 +211,169 @@ class Graph:
                   GREEN + '^^^' + RESET)
 
     def __init__(self, rawboard, nplayers):
-        three_players = nplayers == 3
-        nrows = len(rawboard)
-        ncols = len(rawboard[0])
+        """
+        :param rawboard: the list of rows of cell strings returned by
+               giganten.read_board(), a parsed board such as a ParsedBoard
+               or a board_cache.CompiledBoard, or the topology of another
+               Graph to share it
+        :param nplayers: the number of players; "x" cells have no wells in
+               a 3-player game
+        """
+        if isinstance(rawboard, Topology):
+            topology = rawboard
+            assert topology.nplayers == nplayers
+        else:
+            parsed = (parse_board(rawboard) if isinstance(rawboard, list)
+                      else rawboard)
+            topology = Topology(parsed, nplayers)
+        self.topology = topology
+        nrows = topology.rows
+        ncols = topology.columns
         board = [[Node(r, c) for c in range(ncols)] for r in range(nrows)]
         # nodes = np.array(nodes)
-        for r, row in enumerate(board):
-            for c, node in enumerate(row):
-                # See read_board() for a description of the pattern
-                m = re.match(r'(\d?)(\.(\d?)([xd]?))?',
-                             (cell := rawboard[r][c]).lower())
-                node.cell = cell
-                # print(f'{r=} {c=} {m.group(1,2,3,4)=}')
-                if m is None:
-                    raise ValueError(
-                        f"In row {r}, col {c}, '{cell}' failed match.")
-                node.terrain = 1 if m.group(1) == '' else int(m.group(1))
-                if m.group(3):  # if wells are specified
-                    node.wells = 0 if (m.group(4) == 'x' and three_players
-                                       ) else int(m.group(3))
-                # For testing, force a derrick
-                # print(node)
-                # print(f'{m.group(4)=}')
-                if m.group(4) == 'd':
-                    node.derrick = True
         self.board = board
+        self.epoch = 0
         self.rows = nrows
         self.columns = ncols
         # Make a 1d view of the 2d board
-        self.graph = [node for row in board for node in row]
+        self.graph = graph = [node for row in board for node in row]
         # print(self.graph)
-        for node in self.graph:
-            node.set_neighbors(board)
+        adj_start = topology.adj_start
+        adj_index = topology.adj_index
+        for index, node in enumerate(graph):
+            node.graph = self
+            node.index = index
+            node.terrain = topology.terrain[index]
+            node.set_neighbors([graph[i] for i in
+                                adj_index[adj_start[index]:adj_start[index + 1]]])
+        self.terrain = topology.terrain
+        self.adj_start = adj_start
+        self.adj_index = adj_index
+        self.volatile = tuple(graph[i] for i in topology.volatile)
+        # Working storage for giganten.dijkstra_array: reached[i] and
+        # done[i] are the epoch in which node i was last reached and
+        # visited.
+        nnodes = len(graph)
+        self.distance = [sys.maxsize] * nnodes
+        self.previous = [-1] * nnodes
+        self.reached = [0] * nnodes
+        self.done = [0] * nnodes
+        self.sites = SiteIndex(self)
+        self.reset()
+
+    def reset(self):
+        """
+        Set the board to its state before a game starts. Called when the
+        Graph is created and again to use it for another game without
+        parsing the board again.
+
+        The Graph arrays used by giganten.dijkstra_array are:
+        terrain: the cost of entering the node
+        wells: the number of wells
+        blocked: 1 if a derrick or a truck is on the node, else 0
+        adj_start, adj_index: the neighbors of node i are
+            adj_index[adj_start[i]:adj_start[i + 1]], in the same order as
+            Node.adjacent.
+        adj_passable: adj_passable[i] is the tuple of the indices of
+            Node.passable, the neighbors of node i that aren't blocked.
+
+        terrain and the adjacency lists are the Topology's and never change.
+        wells, blocked and adj_passable are kept up to date by update_node().
+        @return: None
+        """
+        topology = self.topology
+        graph = self.graph
+        for node, wells, derrick, goal, passable in zip(
+                graph, topology.wells, topology.derrick, topology.goal,
+                topology.adj_passable):
+            node.wells = wells
+            node.derrick = derrick
+            node.goal = goal
+            node.truck = None
+            node.oil_reserve = 0
+            node.exhausted = False
+            node.goal_reached = False
+            node.passable = (node.adjacent if len(passable) == len(
+                node.adjacent) else tuple(graph[i] for i in passable))
+        self.wells = list(topology.wells)
+        self.blocked = list(topology.blocked)
+        self.adj_passable = list(topology.adj_passable)
+        self.node_hash = dict(topology.node_hash)
+        self.board_hash = 0
+        for node_hash in self.node_hash.values():
+            self.board_hash ^= node_hash
+        self.sites.rebuild()
+
+    def snapshot_nodes(self):
+        """
+        Called by Game.snapshot(). Trucks are not included; they are saved
+        with the players.
+        @return: a tuple of the changeable fields of the volatile nodes
+        """
+        return tuple((node.wells, node.derrick, node.goal, node.oil_reserve,
+                      node.exhausted, node.goal_reached)
+                     for node in self.volatile)
+
+    def restore_nodes(self, state, moved=()):
+        """
+        Called by Game.restore() to return the nodes to a state returned by
+        snapshot_nodes(). Only the nodes whose derrick or wells differ, plus
+        the moved nodes, are passed to update_node().
+        @param state: the value returned by snapshot_nodes()
+        @param moved: nodes whose truck field has already been changed
+        @return: None
+        """
+        changed = set(moved)
+        for node, (wells, derrick, goal, oil_reserve, exhausted,
+                   goal_reached) in zip(self.volatile, state):
+            if node.derrick != derrick or node.wells != wells:
+                node.wells = wells
+                node.derrick = derrick
+                changed.add(node)
+            node.goal = goal
+            node.oil_reserve = oil_reserve
+            node.exhausted = exhausted
+            node.goal_reached = goal_reached
+        for node in changed:
+            self.update_node(node)
+
+    def update_node(self, node):
+        """
+        Called by the Node when a derrick or truck is added or removed.
+        Update the arrays, the board hash, the site index and the passable
+        neighbors of the adjacent nodes.
+        @param node: the Node that changed
+        @return: None
+        """
+        index = node.index
+        topology = self.topology
+        blocked = int(bool(node.derrick or node.truck))
+        self.wells[index] = node.wells
+        self.blocked[index] = blocked
+        node_hash = ((topology.blocked_keys[index] if blocked else 0)
+                     ^ (topology.built_keys[index]
+                        if node.derrick or node.exhausted else 0))
+        self.board_hash ^= self.node_hash.pop(index, 0) ^ node_hash
+        if node_hash:
+            self.node_hash[index] = node_hash
+        self.sites.update(node)
+        for neighbor in node.adjacent:
+            neighbor.set_passable()
+            self.adj_passable[neighbor.index] = tuple(
+                n.index for n in neighbor.passable)
 
     def get_rows_cols(self):
         return self.rows, self.columns
 
-    def reset_graph(self):
+    def new_search(self):
         """
-        Called by dijkstra() before each move.
-        @return:
+        Called by dijkstra() before each search. Rather than resetting the
+        distance and previous fields of every node, start a new epoch; the
+        fields of nodes stamped with an older epoch are ignored.
+        @return: the new epoch
         """
-        for node in self.graph:
-            node.distance = sys.maxsize
-            node.previous = None
+        self.epoch += 1
+        return self.epoch
 
     def dump_board(self):
         print('Dump Board')
@@ -82,7 +382,7 @@ class Graph:
                 node = self.board[row][col]
                 print('printing node: ', end='')
                 print(node)
-                if node.previous:
+                if node.get_previous():
                     print('    printing path: ', end='')
                     node.print_path()
 
@@ -108,7 +408,7 @@ class Graph:
     def print_board_narrow(self):
 
         def pr_dist(node):
-            dist = node.distance
+            dist = node.get_distance()
             return f'{dist:2d}' if dist < sys.maxsize else '  '
 
         def pr_wells(node):
@@ -131,7 +431,7 @@ class Graph:
     def print_board(self):
 
         def pr_dist(node):
-            dist = node.distance
+            dist = node.get_distance()
             return f'{dist:2d}' if dist < sys.maxsize else '  '
 
         def pr_wells(node):
@@ -147,7 +447,7 @@ class Graph:
             return wells
 
         def from_arrow(node):
-            if not (previous := node.previous):
+            if not (previous := node.get_previous()):
                 return ' '
             if node.row == previous.row:
                 return (LEFTWARDS_ARROW if node.col > previous.col else
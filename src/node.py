@@ -13,44 +13,40 @@ class Node:
     cost: Number of movement points it costs to enter this node.
     exhausted: True if a derrick has been built and all the oil has been extracted.
     goal: Number of adjacent cells with wells. Decremented if a derrick is built
+
+    A Node holds only its state in one game. What is the same in every game,
+    such as the cell string, is in the Graph's Topology.
     """
+    __slots__ = ('row', 'col', 'terrain', 'wells', 'oil_reserve', 'exhausted',
+                 'goal', 'goal_reached', 'derrick', 'truck', 'adjacent',
+                 'passable', 'graph', 'index', 'distance', 'previous',
+                 'path_goal', 'stamp')
 
-    def set_neighbors(self, board):
+    def set_neighbors(self, neighbors):
         """
         This is called by Graph.__init__.
 
-        :param board: the board from a Graph instance
+        :param neighbors: the nodes next to this node from the Graph's
+               adjacency lists (see graph.grid_adjacency)
 
-        adjacent contains a list of nodes next to this node.
+        adjacent contains a tuple of nodes next to this node.
         A node can have up to 4 adjacent, reduced if it is on an edge.
+        The order, up, left, down, right, is relied on by the searches to
+        break ties.
 
-        :return: None. The adjacent list in this node is set.
+        :return: None. The adjacent tuple in this node is set. The goal
+                 counts are set by Graph.reset() from the Topology.
         """
+        self.adjacent = tuple(neighbors)
 
-        def set1neighbor(nrow, ncol):
-            """
-            :param nrow: neighbor row
-            :param ncol: neighbor column
-            :return: None; the neighbor is added to the list
-            """
-            neighbor = board[nrow][ncol]
-            self.adjacent.append(neighbor)
-            # If the neighbor has wells, you aren't allowed to stop there,
-            # so it can't be a goal.
-            if self.wells and not self.derrick:
-                if neighbor.wells == 0:
-                    neighbor.goal += 1
-
-        lastrow = len(board) - 1
-        lastcol = len(board[0]) - 1
-        if self.row > 0:
-            set1neighbor(self.row - 1, self.col)
-        if self.col > 0:
-            set1neighbor(self.row, self.col - 1)
-        if self.row < lastrow:
-            set1neighbor(self.row + 1, self.col)
-        if self.col < lastcol:
-            set1neighbor(self.row, self.col + 1)
+    def set_passable(self):
+        """
+        Set passable to the adjacent nodes without a derrick or a truck, in
+        the same order as adjacent. Called by Graph.update_node when a
+        neighbor changes.
+        """
+        self.passable = tuple(n for n in self.adjacent
+                              if not (n.derrick or n.truck))
 
     def add_derrick(self):
         # Make the adjacent not to be goals.
@@ -62,6 +58,7 @@ class Node:
             # the Giganten board.
             assert node.goal > 0
             node.goal -= 1
+        self.graph.update_node(self)
 
     def remove_derrick(self):
         # Make this node passable
@@ -69,9 +66,43 @@ class Node:
         self.derrick = False
         self.exhausted = True
         self.wells = 0
+        self.graph.update_node(self)
+
+    def set_truck(self, player: Union[Player, None]):
+        """
+        Place a player's truck on this node or, if player is None, remove it.
+        A node with a truck is impassable.
+        """
+        self.truck = player
+        self.graph.update_node(self)
+
+    @property
+    def id(self) -> str:
+        return f'<{self.row},{self.col}>'
+
+    @property
+    def cell(self) -> str:
+        """
+        :return: this node's string from rawboard
+        """
+        return self.graph.topology.cells[self.index]
+
+    def get_distance(self):
+        """
+        :return: the distance set by the latest search of the graph or
+                 sys.maxsize if the search didn't reach this node.
+        """
+        return self.distance if self.stamp == self.graph.epoch else sys.maxsize
+
+    def get_previous(self):
+        """
+        :return: the previous node set by the latest search of the graph or
+                 None if the search didn't reach this node.
+        """
+        return self.previous if self.stamp == self.graph.epoch else None
 
     def print_path(self):
-        nextprev = self.previous
+        nextprev = self.get_previous()
         path = []
         while nextprev:
             # print(f'nextprev: {nextprev}')
@@ -83,7 +114,6 @@ class Node:
     def __init__(self, row: int, col: int, derrick=False):
         self.row: int = row
         self.col: int = col
-        self.id: str = f'<{row},{col}>'
         self.terrain: int = 0
         # wells: int in 0..3: the number of wells on the square. If non-zero
         # the square is covered with a tile at the start of the game. Wells
@@ -99,12 +129,18 @@ class Node:
         self.goal_reached: bool = False
         self.derrick: bool = derrick
         self.truck: Union[Player, None] = None  # set when a truck moves here
-        self.adjacent = []  # will be populated by set_neighbors
-        self.cell = None  # this node's string from rawboard
+        self.adjacent = ()  # will be populated by set_neighbors
+        self.passable = ()  # will be populated by set_passable
+        # Set by Graph.__init__
+        self.graph = None  # the Graph containing this node
+        self.index: int = -1  # index into graph.graph and the Graph arrays
 
         # Fields set by dijkstra
         self.distance: int = sys.maxsize
         self.previous: Union[Node, None] = None  # will be set when visited
+        # the sum of the goal fields of the nodes on the path from the root
+        self.path_goal: int = 0
+        self.stamp: int = 0  # the Graph.epoch of the search that set them
 
     def __repr__(self):
         e = 'T' if self.exhausted else 'F'
@@ -120,8 +156,9 @@ class Node:
         s = f'Node {self.id} t: {self.terrain}, '
         s += f'w: {self.wells} '
         s += f'ex={e}, goal={g}, derrick={d}, truck={t}, '
-        s += f'previous={self.previous}, '
-        s += f'dist: {"∞" if self.distance == sys.maxsize else self.distance}, '
+        dist = self.get_distance()
+        s += f'previous={self.get_previous()}, '
+        s += f'dist: {"∞" if dist == sys.maxsize else dist}, '
         sa = sorted(list(self.adjacent))
         s += f'adjacent: {[ss.id for ss in sa]}'
         return s
@@ -132,4 +169,4 @@ class Node:
 
     # Needed by heapq
     def __lt__(self, other):
-        return self.distance < other.distance
+        return self.get_distance() < other.get_distance()
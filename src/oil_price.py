@@ -13,11 +13,27 @@ Rule 1 is the standard as defined in the game rules.
 
 Rule 2 changes the rule so that the die color always controls whether the price
     increases or decreases, only limited by the minimum and maximum price.
+
+By default the games are played in parallel with NumPy: all the dice are
+thrown at once and each move advances the price in every game with array
+operations (next_prices_1 and next_prices_2). --loop plays one move at a time
+with next_price_1 and next_price_2 instead.
+
+--exact skips the sampling. Prices move in $500 steps and the six faces of
+the die are equally likely, so a rule is a finite Markov chain. The
+transition matrix is built by price_chain() and the stationary distribution,
+the expected price after each turn and the mixing time are computed from it.
+--sweep does this for every combination of the given thresholds.
 """
+import argparse
+from collections import namedtuple
+from contextlib import contextmanager
+import itertools
 import math
 import numpy as np
 import matplotlib.pyplot as plt
 import random
+import sys
 
 debug = False
 maxblue = 9000
@@ -30,6 +46,8 @@ dicecolors = [0, 1, 0, 1, 0, 1]
 red = 0
 blue = 1
 colors = ('R', 'B')
+_dicevalues = np.array(dicevalues)
+_dicecolors = np.array(dicecolors)
 
 
 def next_price_1(oldprice, throw):
@@ -68,6 +86,27 @@ def next_price_2(oldprice, throw):
     return newprice
 
 
+def next_prices_1(oldprices, throws):
+    """
+    next_price_1 for arrays of prices and throws of the same shape.
+    """
+    deltaprice = _dicevalues[throws] * 500
+    color = _dicecolors[throws]
+    up = np.where(color == red, oldprices < minwhite, oldprices < minblue)
+    return np.where(up, oldprices + deltaprice, oldprices - deltaprice)
+
+
+def next_prices_2(oldprices, throws):
+    """
+    next_price_2 for arrays of prices and throws of the same shape.
+    """
+    deltaprice = _dicevalues[throws] * 500
+    color = _dicecolors[throws]
+    return np.where(color == red,
+                    np.maximum(oldprices - deltaprice, minred),
+                    np.minimum(oldprices + deltaprice, maxblue))
+
+
 def next_price(oldprice):
     ix = random.randint(0, 5)
     return next_price_1(oldprice, ix)
@@ -105,37 +144,286 @@ def game(moves):
     return mean1, mean2, stddev1, stddev2
 
 
-def stats(an, mm, ss, count, lbl, color):
-    print(f'Algorithm {an}:')
-    meanm = np.ndarray.mean(mm)
-    stddevm = math.sqrt(np.ndarray.var(mm, ddof=1))
-    means = np.ndarray.mean(ss)
-    stddevs = math.sqrt(np.ndarray.var(ss, ddof=1))
-    print(f'{meanm=:.2f}, {stddevm=:.2f}, {means=:.2f}, {stddevs=:.2f}')
-    plt.plot(list(count), list(count.values()), '-ok', label=lbl, color=color)
+def new_count():
+    return {float(x): 0.0 for x in range(minred, maxblue + 1, 500)}
 
 
-if __name__ == '__main__':
-    games = 500
-    moves_per_game = 100
-    print(f'{games=}, moves per games: {moves_per_game}')
+def play_games_loop(games, moves):
+    """
+    Play the games one move at a time with game().
+    @return: a tuple of the per-game means and standard deviations of the
+             two rules and the counts of each price: mm1, mm2, ss1, ss2,
+             count1, count2
+    """
+    global count1, count2
     mm1 = np.zeros(games)
     mm2 = np.zeros(games)
     ss1 = np.zeros(games)
     ss2 = np.zeros(games)
-    count1 = {float(x): 0.0 for x in range(1500, 9001, 500)}
-    count2 = {float(x): 0.0 for x in range(1500, 9001, 500)}
+    count1 = new_count()
+    count2 = new_count()
 
     for n in range(games):
-        m1, m2, s1, s2 = game(moves_per_game)
+        m1, m2, s1, s2 = game(moves)
         mm1[n] = m1
         mm2[n] = m2
         ss1[n] = s1
         ss2[n] = s2
+    return mm1, mm2, ss1, ss2, count1, count2
+
+
+def play_games_np(games, moves, seed=None):
+    """
+    Play all the games in parallel. The dice for every move of every game are
+    thrown at once, then each move advances every game's price with array
+    operations. Only running sums and counts are kept, not every price, so
+    the memory used doesn't grow with the number of moves. Prices are
+    multiples of 500 so the sums are exact.
+    @return: the same as play_games_loop
+    """
+    rng = np.random.default_rng(seed)
+    throws = rng.integers(0, 6, size=(moves, games), dtype=np.int8)
+    nbins = len(new_count())
+    results = []
+    for next_prices in (next_prices_1, next_prices_2):
+        price = np.full(games, 5000, dtype=np.int64)
+        total = np.zeros(games, dtype=np.int64)
+        total_sq = np.zeros(games, dtype=np.int64)
+        bins = np.zeros(nbins, dtype=np.int64)
+        for t in range(moves):
+            price = next_prices(price, throws[t])
+            total += price
+            total_sq += price * price
+            # Index the prices by $500 steps from the minimum.
+            bins += np.bincount((price - minred) // 500, minlength=nbins)
+        mean = total / moves
+        var = (total_sq - total * mean) / (moves - 1)
+        count = new_count()
+        for n, occurrences in enumerate(bins):
+            count[float(minred + n * 500)] = float(occurrences)
+        results.append((mean, np.sqrt(var), count))
+    (mm1, ss1, count1), (mm2, ss2, count2) = results
+    return mm1, mm2, ss1, ss2, count1, count2
+
+
+"""
+    prices: the states of the chain, in ascending order
+    matrix: matrix[i, j] is the probability that the price goes from
+            prices[i] to prices[j] in one turn.
+"""
+PriceChain = namedtuple('PriceChain', 'prices matrix')
+
+
+@contextmanager
+def thresholds(**kwargs):
+    """
+    Temporarily replace the module's thresholds, for example
+    with thresholds(minwhite=3500): ...
+    The rules read the thresholds when they are called.
+    """
+    old = {name: globals()[name] for name in kwargs}
+    globals().update(kwargs)
+    try:
+        yield
+    finally:
+        globals().update(old)
+
+
+def price_chain(rule, start=5000):
+    """
+    Build the Markov chain of the prices reachable from start.
+    @param rule: a function like next_price_1(oldprice, throw)
+    @param start: the initial price
+    @return: a PriceChain
+    """
+    reachable = {start}
+    todo = [start]
+    moves = {}
+    while todo:
+        price = todo.pop()
+        moves[price] = [rule(price, throw) for throw in range(len(dicevalues))]
+        for newprice in moves[price]:
+            if newprice not in reachable:
+                reachable.add(newprice)
+                todo.append(newprice)
+    prices = sorted(reachable)
+    index = {price: i for i, price in enumerate(prices)}
+    matrix = np.zeros((len(prices), len(prices)))
+    for price, newprices in moves.items():
+        for newprice in newprices:
+            matrix[index[price], index[newprice]] += 1 / len(newprices)
+    return PriceChain(np.array(prices), matrix)
+
+
+def stationary(chain):
+    """
+    @return: the stationary distribution pi, the solution of pi P = pi with
+             the probabilities summing to 1.
+    """
+    nstates = len(chain.prices)
+    a = np.vstack([chain.matrix.T - np.eye(nstates), np.ones(nstates)])
+    b = np.zeros(nstates + 1)
+    b[-1] = 1
+    return np.linalg.lstsq(a, b, rcond=None)[0]
+
+
+def expected_prices(chain, turns, start=5000):
+    """
+    @return: an array of the expected price after each of turns turns.
+    """
+    dist = (chain.prices == start).astype(float)
+    expected = np.empty(turns)
+    for t in range(turns):
+        dist = dist @ chain.matrix
+        expected[t] = dist @ chain.prices
+    return expected
+
+
+def mixing_time(chain, epsilon=0.25, maxturns=10_000):
+    """
+    @return: the number of turns after which the distribution of the price
+             is within total variation distance epsilon of the stationary
+             distribution whatever the starting price, or None if that takes
+             more than maxturns turns.
+    """
+    pi = stationary(chain)
+    power = np.eye(len(chain.prices))
+    for t in range(1, maxturns + 1):
+        power = power @ chain.matrix
+        if 0.5 * np.abs(power - pi).sum(axis=1).max() <= epsilon:
+            return t
+    return None
+
+
+def analyze(rule, moves, start=5000):
+    """
+    @return: a dict of the exact statistics of a rule: the number of prices
+             reachable, the stationary mean and standard deviation, the mean
+             over a game of moves moves (the exact meanm of the sampled
+             study), the expected price after moves moves and the mixing
+             time.
+    """
+    chain = price_chain(rule, start)
+    pi = stationary(chain)
+    mean = pi @ chain.prices
+    expected = expected_prices(chain, moves, start)
+    return {'states': len(chain.prices),
+            'mean': mean,
+            'stddev': math.sqrt(pi @ (chain.prices - mean) ** 2),
+            'game_mean': expected.mean(),
+            'final': expected[-1],
+            'mixing': mixing_time(chain)}
+
+
+def sweep(rule, moves, ranges, start=5000):
+    """
+    Analyze a rule for every combination of thresholds.
+    @param rule: next_price_1 or next_price_2
+    @param moves: moves per game
+    @param ranges: a dict of threshold name: list of values
+    @param start: the initial price
+    @return: a list of (thresholds dict, analyze() dict)
+    """
+    results = []
+    names = list(ranges)
+    for values in itertools.product(*(ranges[n] for n in names)):
+        params = dict(zip(names, values))
+        with thresholds(**params):
+            results.append((params, analyze(rule, moves, start)))
+    return results
+
+
+def print_analysis(an, params, result):
+    mixing = result['mixing']
+    print(f'Algorithm {an}: '
+          + ''.join(f'{name}={value}, ' for name, value in params.items())
+          + f'states={result["states"]}, mean={result["mean"]:.2f}, '
+          f'stddev={result["stddev"]:.2f}, '
+          f'game mean={result["game_mean"]:.2f}, '
+          f'final={result["final"]:.2f}, '
+          f'mixing time={mixing if mixing is not None else "∞"}')
+
+
+def stats(an, mm, ss, count, lbl, color):
+    print(f'Algorithm {an}:')
+    meanm = np.ndarray.mean(mm)
+    stddevm = math.sqrt(np.ndarray.var(mm, ddof=1))
+    means = np.ndarray.mean(ss)
+    stddevs = math.sqrt(np.ndarray.var(ss, ddof=1))
+    print(f'{meanm=:.2f}, {stddevm=:.2f}, {means=:.2f}, {stddevs=:.2f}')
+    plt.plot(list(count), list(count.values()), '-ok', label=lbl, color=color)
+
+
+def getargs():
+    parser = argparse.ArgumentParser(description='''
+        Compare two rules for adjusting the price of oil.
+        ''')
+    parser.add_argument('-g', '--games', type=int, default=500, help='''
+    Number of games to play. Default is 500.
+    ''')
+    parser.add_argument('-m', '--moves', type=int, default=100, help='''
+    Number of moves per game. Default is 100.
+    ''')
+    parser.add_argument('--exact', action='store_true', help='''
+    Compute the statistics of the rules exactly from their Markov chains
+    instead of playing games.
+    ''')
+    parser.add_argument('--loop', action='store_true', help='''
+    Play the games one move at a time instead of in parallel with NumPy.
+    ''')
+    parser.add_argument('--noplot', action='store_true', help='''
+    Print the statistics without plotting the histogram.
+    ''')
+    parser.add_argument('--seed', type=int, help='''
+    Random seed.
+    ''')
+    parser.add_argument('--sweep', nargs='+', metavar='NAME=V1,V2...',
+                        help='''
+    Analyze the rules exactly for every combination of these thresholds,
+    for example: --sweep minwhite=3500,4000 minblue=6500,7000. The names
+    are any of maxblue, minblue, minwhite and minred.
+    ''')
+    args = parser.parse_args()
+    if args.sweep:
+        ranges = {}
+        for arg in args.sweep:
+            name, _, values = arg.partition('=')
+            if name not in ('maxblue', 'minblue', 'minwhite', 'minred'):
+                parser.error(f'Unknown threshold: {name}')
+            try:
+                ranges[name] = [int(v) for v in values.split(',')]
+            except ValueError:
+                parser.error(f'Bad values for {name}: {values!r}, expected '
+                             f'integers separated by commas')
+        args.sweep = ranges
+    return args
+
+
+if __name__ == '__main__':
+    _args = getargs()
+    games = _args.games
+    moves_per_game = _args.moves
+    if _args.exact or _args.sweep:
+        print(f'moves per game: {moves_per_game}')
+        for n, rule in ((1, next_price_1), (2, next_price_2)):
+            for params, result in sweep(rule, moves_per_game,
+                                        _args.sweep or {}):
+                print_analysis(n, params, result)
+        sys.exit()
+    print(f'{games=}, moves per games: {moves_per_game}')
+    if _args.loop:
+        random.seed(_args.seed)
+        mm1, mm2, ss1, ss2, count1, count2 = play_games_loop(games,
+                                                             moves_per_game)
+    else:
+        mm1, mm2, ss1, ss2, count1, count2 = play_games_np(games,
+                                                           moves_per_game,
+                                                           _args.seed)
 
     plt.xlabel('Oil Price')
     plt.ylabel(f'Occurences in {games} games, each of {moves_per_game} moves')
     stats(1, mm1, ss1, count1, "Original Algorithm", 'blue')
     stats(2, mm2, ss2, count2, "Modified Algorithm", 'red')
-    plt.legend()
-    plt.show()
+    if not _args.noplot:
+        plt.legend()
+        plt.show()
@@ -1,3 +1,4 @@
+from array import array
 from collections import namedtuple
 import config
 import node
@@ -10,12 +11,54 @@ import node
 Actions = namedtuple('Actions', 'nlicenses movement markers backwards oilprice')
 
 
+def train_advance(train_col, points):
+    """
+    :param train_col: the column the train is in
+    :param points: the movement points available
+    :return: the number of columns the train can move
+    """
+    col = train_col
+    while (needed := config.TRAIN_COSTS[col + 1]) <= points:
+        points -= needed
+        col += 1
+    return col - train_col
+
+
+"""
+    TRAIN_ADVANCE[train_col][points] is train_advance(train_col, points) for
+    every column the train can be in and every number of points on an action
+    card. Use train_advance() for more points.
+"""
+_MAX_MOVEMENT = max(card.movement for card in config.RED_ACTION_CARDS
+                    + config.BEIGE_ACTION_CARDS)
+TRAIN_ADVANCE = tuple(tuple(train_advance(col, points)
+                            for points in range(_MAX_MOVEMENT + 1))
+                      for col in range(len(config.TRAIN_COSTS) - 1))
+
+
+def hist_entry(truck_node):
+    """
+    :return: the entry in Player.truck_hist for a move to truck_node: the
+             node's index shifted left one bit, with the low bit set if the
+             node was a goal reached by the move
+    """
+    return truck_node.index << 1 | truck_node.goal_reached
+
+
 class Player:
+    __slots__ = ('id', 'truck_node', 'truck_hist', 'train_col',
+                 'free_oil_rigs', 'rigs_in_use', 'cash', 'storage_tanks',
+                 'actions', 'single_licenses', 'double_licenses', 'nlicenses',
+                 'weights')
 
-    def __init__(self, playerid: int, truck_node: node.Node):
+    def __init__(self, playerid: int, truck_node: node.Node,
+                 weights: config.Weights = config.DEFAULT_WEIGHTS):
         self.id: int = playerid
+        # the weights of giganten.choose_goal(); they don't change in a game
+        self.weights = weights
         self.truck_node: node.Node = truck_node
-        self.truck_hist: list[str] = [str(truck_node)]
+        # truck_hist: a hist_entry() for each node the truck has been on
+        self.truck_hist = array('I', (hist_entry(truck_node),))
         self.train_col = 0
         self.free_oil_rigs: int = config.INITIAL_OIL_RIGS
         self.rigs_in_use: list[node.Node] = []
@@ -30,24 +73,66 @@ class Player:
         self.actions: Actions = Actions(nlicenses, movement, markers,
                                         backwards, oilprice)
 
-    def advance_train(self, verbos):
+    def advance_train(self, distance, verbos):
         """
         The same movement points are used for the truck and the train.
 
         We've already moved the truck. If any movement points are left, advance
         the train.
+
+        :param distance: the movement points the truck used, as returned by
+               giganten.choose_goal()
         """
         old_movement = movement = self.actions.movement  # from action card just drawn
         old_train_col = self.train_col
-        movement -= self.truck_node.distance
-        # needed: cost to move to next column increases as we advance
-        while (needed := config.TRAIN_COSTS[self.train_col + 1]) <= movement:
-            movement -= needed
-            self.train_col += 1
+        movement -= distance
+        # the cost to move to the next column increases as we advance
+        row = TRAIN_ADVANCE[self.train_col]
+        self.train_col += (row[movement] if movement < len(row)
+                           else train_advance(self.train_col, movement))
         if verbos >= 2:
+            movement -= sum(config.TRAIN_COSTS[old_train_col + 1:
+                                               self.train_col + 1])
             print(f'advance_train: player {self.id}, movement: {old_movement}->'
                   f'{movement}, train_col {old_train_col} -> {self.train_col}, '
-                  f'truck dist = {self.truck_node.distance}')
+                  f'truck dist = {distance}')
+
+    def truck_path(self):
+        """
+        :return: the nodes in truck_hist formatted as by str(Node)
+        """
+        columns = self.truck_node.graph.columns
+        path = []
+        for entry in self.truck_hist:
+            row, col = divmod(entry >> 1, columns)
+            path.append(f'<{row},{col}>{"*" if entry & 1 else ""}')
+        return path
+
+    def snapshot(self):
+        """
+        Called by Game.snapshot().
+        @return: a tuple of the fields that change during a game
+        """
+        return (self.truck_node, self.truck_hist[:], self.train_col,
+                self.free_oil_rigs, tuple(self.rigs_in_use), self.cash,
+                tuple(self.storage_tanks), self.actions,
+                tuple(self.single_licenses), tuple(self.double_licenses),
+                self.nlicenses)
+
+    def restore(self, state):
+        """
+        Called by Game.restore(). The truck is not placed on its node; that
+        is left to the Game, which updates the board once for all players.
+        @param state: the value returned by snapshot()
+        """
+        (self.truck_node, truck_hist, self.train_col, self.free_oil_rigs,
+         rigs_in_use, self.cash, storage_tanks, self.actions,
+         single_licenses, double_licenses, self.nlicenses) = state
+        self.truck_hist = truck_hist[:]
+        self.rigs_in_use = list(rigs_in_use)
+        self.storage_tanks = list(storage_tanks)
+        self.single_licenses = list(single_licenses)
+        self.double_licenses = list(double_licenses)
 
     def __repr__(self):
         s = f'{self.id}'
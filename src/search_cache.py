@@ -0,0 +1,116 @@
+"""
+A least recently used cache of search results, for giganten --searchcache.
+
+Many searches repeat exactly: every game starts with the trucks on the same
+nodes and the same few movement values, and the rollouts of select_card()
+search the same positions again and again. The result of a search is
+determined by its root, its maxcost and the board state the searches read:
+which nodes are blocked by a derrick or a truck, and on which nodes a
+derrick has been built, since that changes the wells and the goals around
+it. Graph.board_hash is a Zobrist hash of that state kept up to date by
+Graph.update_node(), so the key of a search is
+
+    (root index, maxcost, graph.board_hash)
+
+A cached result is a SearchResult of arrays copied from the visited Nodes.
+It doesn't refer to the Nodes, whose distance and previous fields are
+overwritten by the next search, so it stays valid in any Graph of the same
+board. The cache holds the results of one board; giganten.init_worker()
+makes a new one for each board.
+
+The memory used by the results is estimated from the lengths of the arrays
+plus ENTRY_BYTES for each entry. When it exceeds the cap, the least recently
+used entries are dropped.
+"""
+from array import array
+from collections import OrderedDict, namedtuple
+
+"""
+    The result of a search from a root, with an entry for each node visited
+    in the order the search visited it:
+
+    visited: the Node.index of the node
+    distance: its distance from the root
+    path_goal: its path_goal, as set by the search
+"""
+SearchResult = namedtuple('SearchResult', 'visited distance path_goal')
+
+# The estimated bytes of an entry besides its arrays: the key, the
+# SearchResult, the array headers and the OrderedDict links.
+ENTRY_BYTES = 500
+
+
+def export_result(visited):
+    """
+    @param visited: the visited nodes returned by a search
+    @return: a SearchResult copied from the nodes
+    """
+    return SearchResult(array('I', [node.index for node in visited]),
+                        array('I', [node.distance for node in visited]),
+                        array('I', [node.path_goal for node in visited]))
+
+
+def result_bytes(result):
+    return ENTRY_BYTES + sum(a.itemsize * len(a) for a in result)
+
+
+class SearchCache:
+    """
+    hits, misses: the number of calls of get() that found and didn't find
+        the key since the cache was made or take_counts() was last called.
+    nbytes: the estimated memory used by the entries.
+    """
+
+    def __init__(self, maxbytes):
+        """
+        @param maxbytes: the cap on nbytes
+        """
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        @return: the SearchResult cached for key, or None
+        """
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        """
+        Cache a result, dropping the least recently used entries if the
+        cache is over its cap. A result bigger than the cap isn't cached.
+        @param key: the key returned by get() as missing
+        @param result: a SearchResult
+        @return: None
+        """
+        size = result_bytes(result)
+        if size > self.maxbytes:
+            return
+        entries = self.entries
+        if key in entries:
+            self.nbytes -= result_bytes(entries.pop(key))
+        entries[key] = result
+        self.nbytes += size
+        while self.nbytes > self.maxbytes:
+            _, dropped = entries.popitem(last=False)
+            self.nbytes -= result_bytes(dropped)
+
+    def take_counts(self):
+        """
+        @return: the hits and misses since the last call, which are reset to
+                 zero
+        """
+        counts = self.hits, self.misses
+        self.hits = self.misses = 0
+        return counts
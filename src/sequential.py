@@ -0,0 +1,152 @@
+"""
+Sequential stopping of a batch of games, for giganten --tolerance.
+
+Rather than always playing --games games, giganten checks after each game
+whether the confidence intervals it is after are narrow enough, and stops
+as soon as they are. --games becomes the most games to play.
+
+- By default the intervals are those of each player's win rate, the
+  fraction of the games the player won or tied for first. They are Wilson
+  score intervals, which behave well for rates near 0 or 1.
+- With --difference A B, the interval is that of the difference between
+  the win rates of players A and B, for example two strategies or two sets
+  of weights. It is the normal interval of the mean of the per-game
+  difference, which is 1, 0 or -1. It is paired: both players are in every
+  game, so the luck of the deal cancels.
+
+A batch is settled when the half-width of every interval, the margin in
+"rate +/- margin", is at most the tolerance. No check is made before
+--mingames games, so that a run of identical results early on doesn't stop
+the batch.
+
+The games are seeded by number and are counted in that order even when
+they are played by workers, so a batch stops after the same games however
+many workers play it.
+"""
+import math
+from statistics import NormalDist
+
+
+def z_value(confidence):
+    """
+    @param confidence: the confidence level, for example 0.95
+    @return: the two-sided normal quantile, 1.96 for 0.95
+    """
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def wilson_interval(wins, games, z):
+    """
+    @return: the Wilson score interval (low, high) of a proportion
+    """
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    z2 = z * z
+    centre = (p + z2 / (2 * games)) / (1 + z2 / games)
+    margin = (z / (1 + z2 / games)
+              * math.sqrt(p * (1 - p) / games + z2 / (4 * games * games)))
+    return centre - margin, centre + margin
+
+
+def mean_interval(total, total_sq, games, z):
+    """
+    @param total: the sum of the samples
+    @param total_sq: the sum of their squares
+    @return: the normal interval (low, high) of the mean of the samples
+    """
+    if games < 2:
+        return -math.inf, math.inf
+    mean = total / games
+    variance = max(0.0, (total_sq - total * mean) / (games - 1))
+    margin = z * math.sqrt(variance / games)
+    return mean - margin, mean + margin
+
+
+class WinRates:
+    """
+    The running counts of a batch of games.
+    games: the number of games counted
+    wins: the number of games each player won or tied for first
+    """
+
+    def __init__(self, nplayers, confidence, difference=None):
+        """
+        @param nplayers: the number of players
+        @param confidence: the confidence level of the intervals
+        @param difference: None, or the ids of two players whose difference
+               in win rate is wanted rather than each player's win rate
+        """
+        self.confidence = confidence
+        self.z = z_value(confidence)
+        self.difference = difference
+        self.games = 0
+        self.wins = [0] * nplayers
+        self.diff_total = 0
+        self.diff_total_sq = 0
+
+    def add(self, winnerlist):
+        """
+        Count a game.
+        @param winnerlist: the ids of the players who won or tied for first
+        @return: None
+        """
+        self.games += 1
+        for w in winnerlist:
+            self.wins[w] += 1
+        if self.difference:
+            a, b = self.difference
+            diff = (a in winnerlist) - (b in winnerlist)
+            self.diff_total += diff
+            self.diff_total_sq += diff * diff
+
+    def intervals(self):
+        """
+        @return: a list of (rate, low, high) for each player
+        """
+        return [(wins / self.games if self.games else 0.0,
+                 *wilson_interval(wins, self.games, self.z))
+                for wins in self.wins]
+
+    def difference_interval(self):
+        """
+        @return: (difference, low, high) of the win rates of the two
+                 --difference players
+        """
+        mean = self.diff_total / self.games if self.games else 0.0
+        return (mean, *mean_interval(self.diff_total, self.diff_total_sq,
+                                     self.games, self.z))
+
+    def settled(self, tolerance, mingames):
+        """
+        @return: True if at least mingames games have been counted and the
+                 half-width of every interval is at most tolerance
+        """
+        if self.games < max(mingames, 2):
+            return False
+        if self.difference:
+            intervals = [self.difference_interval()]
+        else:
+            intervals = self.intervals()
+        return all((high - low) / 2 <= tolerance
+                   for _, low, high in intervals)
+
+    def report(self, tolerance, mingames, maxgames):
+        """
+        Print the intervals and the number of games used.
+        """
+        percent = f'{100 * self.confidence:g}%'
+        if self.settled(tolerance, mingames):
+            print(f'settled after {self.games} of at most {maxgames} games: '
+                  f'the {percent} intervals are within +/-{tolerance}')
+        else:
+            print(f'not settled after {self.games} games: the {percent} '
+                  f'intervals are not all within +/-{tolerance}')
+        for player, (rate, low, high) in enumerate(self.intervals()):
+            print(f'player {player}: win rate {rate:.3f} '
+                  f'[{low:.3f}, {high:.3f}]')
+        if self.difference:
+            a, b = self.difference
+            diff, low, high = self.difference_interval()
+            print(f'player {a} - player {b}: {diff:+.3f} '
+                  f'[{low:+.3f}, {high:+.3f}]')
@@ -1,7 +1,11 @@
 """
 https://www.bogotobogo.com/python/python_Dijkstras_Shortest_Path_Algorithm.php
+
+The search keeps the unvisited vertices it has reached in an IndexedHeap, so
+a shorter distance to a vertex already queued is a decrease_key() rather
+than a rebuild of the queue. It runs in O((V + E) log V) on any graph with
+non-negative weights, not only the grid boards of giganten.
 """
-import heapq
 import sys
 
 
@@ -34,6 +38,94 @@ class Vertex:
         return self.distance < other.distance
 
 
+class IndexedHeap:
+    """
+    A binary min-heap of items with priorities. The position of each item in
+    the heap is kept in a dict, so that the priority of a queued item can be
+    lowered with decrease_key() in O(log n). Items with equal priorities are
+    popped in the order they were pushed. The items must be hashable.
+    """
+
+    def __init__(self):
+        self._heap = []  # [priority, sequence number, item]
+        self._position = {}  # item -> index of its entry in _heap
+        self._count = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, item):
+        return item in self._position
+
+    def push(self, item, priority):
+        entry = [priority, self._count, item]
+        self._count += 1
+        self._heap.append(entry)
+        self._position[item] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def pop(self):
+        """
+        :return: the item with the lowest priority and its priority
+        """
+        heap = self._heap
+        last = heap.pop()
+        if heap:
+            entry = heap[0]
+            heap[0] = last
+            self._position[last[2]] = 0
+            self._sift_down(0)
+        else:
+            entry = last
+        del self._position[entry[2]]
+        return entry[2], entry[0]
+
+    def decrease_key(self, item, priority):
+        """
+        Lower the priority of a queued item.
+        """
+        index = self._position[item]
+        entry = self._heap[index]
+        assert priority <= entry[0]
+        entry[0] = priority
+        self._sift_up(index)
+
+    def _sift_up(self, index):
+        heap = self._heap
+        position = self._position
+        entry = heap[index]
+        key = entry[:2]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if key >= heap[parent][:2]:
+                break
+            heap[index] = heap[parent]
+            position[heap[index][2]] = index
+            index = parent
+        heap[index] = entry
+        position[entry[2]] = index
+
+    def _sift_down(self, index):
+        heap = self._heap
+        position = self._position
+        size = len(heap)
+        entry = heap[index]
+        key = entry[:2]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][:2] < heap[child][:2]:
+                child += 1
+            if key <= heap[child][:2]:
+                break
+            heap[index] = heap[child]
+            position[heap[index][2]] = index
+            index = child
+        heap[index] = entry
+        position[entry[2]] = index
+
+
 class Graph:
     def __init__(self):
         self.vert_dict = {}
@@ -66,46 +158,59 @@ class Graph:
 
 def shortest(v, path):
     """ make shortest path from v.previous"""
-    if v.previous:
+    while v.previous:
         path.append(v.previous.id)
-        shortest(v.previous, path)
+        v = v.previous
     return
 
 
-def dijkstra(a_graph, start):
-    print('''Dijkstra's shortest path''')
+def dijkstra(a_graph, start, verbose=True):
+    """
+    Set the distance and previous vertex of every vertex reachable from
+    start. The vertices are reset first, so a graph can be searched any
+    number of times. Vertices that can't be reached are left unvisited with
+    a distance of sys.maxsize.
+    :param a_graph: a Graph with non-negative weights
+    :param start: the Vertex to search from
+    :param verbose: if True, print each relaxation
+    """
+    if verbose:
+        print('''Dijkstra's shortest path''')
+    for v in a_graph:
+        v.distance = sys.maxsize
+        v.visited = False
+        v.previous = None
     # Set the distance for the start node to zero
     start.distance = 0
 
-    # Put the vertices into the priority queue
-    unvisited_queue = [v for v in a_graph]
-    heapq.heapify(unvisited_queue)
+    # The vertices reached but not yet visited
+    queue = IndexedHeap()
+    queue.push(start, 0)
 
-    while len(unvisited_queue):
+    while queue:
         # Pops a vertex with the smallest distance
-        current = heapq.heappop(unvisited_queue)
+        current, current_dist = queue.pop()
         current.visited = True
 
-        # for next in v.adjacent:
-        for nextv in current.adjacent:
+        for nextv, weight in current.adjacent.items():
             # if visited, skip
             if nextv.visited:
                 continue
-            new_dist = current.distance + current.get_weight(nextv)
+            new_dist = current_dist + weight
             nextv_dist = nextv.distance
             if new_dist < nextv_dist:
                 nextv.distance = new_dist
                 nextv.previous = current
+                if nextv in queue:
+                    queue.decrease_key(nextv, new_dist)
+                else:
+                    queue.push(nextv, new_dist)
                 updated = 'updated'
             else:
                 updated = 'not updated'
-            print('%s : current = %s next = %s new_dist = %s'
-                  % (updated, current.id, nextv.id, nextv_dist))
-
-        # Rebuild heap
-        # Put all vertices not visited into the queue
-        unvisited_queue = [v for v in a_graph if not v.visited]
-        heapq.heapify(unvisited_queue)
+            if verbose:
+                print('%s : current = %s next = %s new_dist = %s'
+                      % (updated, current.id, nextv.id, nextv_dist))
 
 
 def main():
@@ -0,0 +1,128 @@
+"""
+An index of the open drill sites of a Graph: the nodes with wells on which
+no derrick has been built. A derrick can be built on a site by a truck
+stopped on one of its goal cells, the neighbors without wells.
+
+The index is kept up to date by Graph.update_node(), which is called by
+Node.add_derrick(), Node.remove_derrick() and Graph.restore_nodes(), and is
+rebuilt by Graph.reset(). The sites are bucketed by column: open[c] has bit r
+set if the node in row r and column c is an open site. So the sites in a
+range of columns, or the site nearest a node, are found without scanning
+the board.
+"""
+import sys
+
+
+class SiteIndex:
+    """
+    open: a list of the bitmasks of the open sites' rows, one per column.
+    count: the number of open sites.
+    """
+    __slots__ = ('graph', 'open', 'count')
+
+    def __init__(self, graph):
+        """
+        Called by Graph.__init__. rebuild() is called by Graph.reset().
+        @param graph: a graph.Graph
+        """
+        self.graph = graph
+        self.open = [0] * graph.columns
+        self.count = 0
+
+    def rebuild(self):
+        """
+        Index the open sites of the graph from scratch.
+        @return: None
+        """
+        self.open = [0] * self.graph.columns
+        self.count = 0
+        nodes = self.graph.graph
+        for index in self.graph.topology.sites:
+            self.update(nodes[index])
+
+    def update(self, node):
+        """
+        Called by Graph.update_node() after a derrick or truck is added or
+        removed.
+        @param node: the Node that changed
+        @return: None
+        """
+        if not self.graph.topology.wells[node.index]:
+            return
+        bit = 1 << node.row
+        was_open = bool(self.open[node.col] & bit)
+        is_open = bool(node.wells and not node.derrick)
+        if is_open != was_open:
+            self.open[node.col] ^= bit
+            self.count += 1 if is_open else -1
+
+    def is_open(self, node):
+        return bool(self.open[node.col] >> node.row & 1)
+
+    def open_sites(self, first=0, last=None):
+        """
+        @param first: the first column
+        @param last: the last column; the default is the last of the board
+        @return: the list of the open sites in columns first to last, by
+                 column and then by row
+        """
+        board = self.graph.board
+        if last is None:
+            last = self.graph.columns - 1
+        sites = []
+        for col in range(max(first, 0), min(last, self.graph.columns - 1) + 1):
+            bits = self.open[col]
+            while bits:
+                low = bits & -bits
+                sites.append(board[low.bit_length() - 1][col])
+                bits ^= low
+        return sites
+
+    def sites_next_to(self, node):
+        """
+        @param node: a goal cell, for example the node a truck stopped on
+        @return: the open sites adjacent to node, in the order of
+                 node.adjacent
+        """
+        return [n for n in node.adjacent if self.is_open(n)]
+
+    def goal_cells(self, site):
+        """
+        @param site: a node with wells
+        @return: the neighbors of site from which it can be built on
+        """
+        nodes = self.graph.graph
+        return [nodes[i] for i in self.graph.topology.site_goals[site.index]]
+
+    def nearest_site(self, node):
+        """
+        Search the columns outwards from the node's column, stopping once
+        the columns are further away than the nearest site found.
+        @param node: a Node, for example a truck's
+        @return: the open site nearest node in moves, ignoring terrain and
+                 blocked nodes, the first in row order on a tie, or None if
+                 there are no open sites
+        """
+        row, col = node.row, node.col
+        columns = self.graph.columns
+        best = None
+        best_dist = sys.maxsize
+        for dcol in range(columns):
+            if dcol > best_dist:
+                break
+            for c in (col - dcol, col + dcol) if dcol else (col,):
+                if not 0 <= c < columns:
+                    continue
+                bits = self.open[c]
+                while bits:
+                    low = bits & -bits
+                    r = low.bit_length() - 1
+                    bits ^= low
+                    dist = dcol + abs(r - row)
+                    if dist < best_dist or (dist == best_dist
+                                            and (r, c) < best):
+                        best = (r, c)
+                        best_dist = dist
+        if best is None:
+            return None
+        return self.graph.board[best[0]][best[1]]
@@ -0,0 +1,294 @@
+"""
+Tune the weights of giganten.choose_goal(), the config.Weights multipliers
+of the goal count, the columns moved, the goals on the path and the columns
+the train can move.
+
+A candidate set of weights is evaluated by playing --games games in which
+one player uses the candidate and the others the baseline weights
+(config.DEFAULT_WEIGHTS, or --baseline). In game n the candidate is player
+n % nplayers, so that it plays every seat equally often. Every candidate
+plays the same game numbers, seeded by giganten.game_seed() from --seed, so
+the candidates are compared on common random numbers: the decks and tiles
+start out the same for all of them, and the differences between their win
+rates owe less to the luck of the deal. A candidate's score is its win
+rate, a tie for first counting as a win. The baseline's own win rate is
+about 1 / nplayers.
+
+--method chooses the candidates from the grid of the --goal, --column,
+--prevgoal and --train values:
+
+    grid   every point of the grid.
+    model  a sequential model-based search of --budget points. It starts
+           with the baseline and --initial random points, then repeatedly
+           fits a quadratic surrogate of the win rate to the points played
+           so far, by least squares with a little ridge regularization, and
+           plays the --batch points it predicts best, one of them random to
+           keep exploring.
+
+The games of each round of candidates are spread over --workers processes.
+The best candidates are printed with their win rates and 95% Wilson
+intervals, and --json writes all of them to a file. A candidate can then be
+given to giganten with --weights.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+import config
+import giganten
+from sequential import wilson_interval, z_value
+
+"""
+    The evaluation of a candidate: its config.Weights and the number of
+    games it won or tied for first out of the number played.
+"""
+Result = namedtuple('Result', 'weights wins games')
+RIDGE = 1e-3  # the regularization of the surrogate's least squares fit
+
+
+def setup(args):
+    """
+    Set the giganten module globals for the board and options given to this
+    program, as init_worker() does in each worker.
+    @return: the giganten arguments and the board, to pass to init_worker()
+    """
+    gargs = giganten.getargs([args.incsv, '-n', str(args.nplayers),
+                              '--seed', str(args.seed), '-v', '0',
+                              '--searchcache', str(args.searchcache)])
+    giganten._args = gargs
+    rawboard = giganten.read_board(gargs.incsv)
+    gargs.incsv.close()
+    # The input file can't be pickled and the workers don't need it.
+    gargs.incsv = None
+    giganten.init_worker(gargs, rawboard, args.seed)
+    return gargs, rawboard
+
+
+def weight_grid(args):
+    """
+    @return: the list of the config.Weights of every combination of the
+             values given for each weight
+    """
+    return [config.Weights(*w) for w in itertools.product(
+        args.goal, args.column, args.prevgoal, args.train)]
+
+
+def play_candidate(task):
+    """
+    Play one game of a candidate against the baseline. Called in a worker
+    process.
+    @param task: (candidate weights, baseline weights, game number)
+    @return: the candidate weights and True if the candidate won or tied
+             for first
+    """
+    weights, baseline, ngame = task
+    nplayers = giganten._nplayers
+    seat = ngame % nplayers
+    players = [baseline] * nplayers
+    players[seat] = weights
+    winners = giganten.play_game(giganten.new_game(ngame, players))
+    return weights, winners is not None and seat in winners
+
+
+def evaluate(pool, candidates, baseline, ngames):
+    """
+    Play ngames games of each candidate.
+    @param pool: a multiprocessing.Pool, or None to play in this process
+    @return: a list of a Result for each candidate
+    """
+    tasks = [(weights, baseline, ngame) for weights in candidates
+             for ngame in range(ngames)]
+    wins = dict.fromkeys(candidates, 0)
+    if pool is None:
+        results = map(play_candidate, tasks)
+    else:
+        results = pool.imap_unordered(play_candidate, tasks,
+                                      max(1, ngames // 4))
+    for weights, won in results:
+        wins[weights] += won
+    return [Result(weights, wins[weights], ngames) for weights in candidates]
+
+
+def features(points):
+    """
+    @param points: an array of weight vectors, one per row
+    @return: the quadratic features of each point: 1, each weight, and the
+             products of each pair of weights, including the squares
+    """
+    points = np.asarray(points, dtype=float)
+    columns = [np.ones(len(points))]
+    columns.extend(points.T)
+    columns.extend(points[:, i] * points[:, j] for i, j in
+                   itertools.combinations_with_replacement(
+                       range(points.shape[1]), 2))
+    return np.column_stack(columns)
+
+
+def fit_surrogate(results):
+    """
+    @param results: the Results played so far
+    @return: a function from an array of weight vectors to the predicted
+             win rates
+    """
+    x = features([result.weights for result in results])
+    y = np.array([result.wins / result.games for result in results])
+    # Ridge regression: solve (X'X + RIDGE I) beta = X'y
+    beta = np.linalg.solve(x.T @ x + RIDGE * np.eye(x.shape[1]), x.T @ y)
+    return lambda points: features(points) @ beta
+
+
+def model_search(pool, args, grid, baseline, rnd):
+    """
+    The sequential model-based search described above.
+    @return: the list of Results of the points played
+    """
+    results = {}
+    initial = [baseline] + rnd.sample(grid, min(args.initial, len(grid)))
+    batch = list(dict.fromkeys(initial))
+    while batch:
+        for result in evaluate(pool, batch, baseline, args.games):
+            results[result.weights] = result
+        print(f'{len(results)} candidates played, best so far: '
+              f'{best(results.values())}')
+        unplayed = [w for w in grid if w not in results]
+        size = min(args.batch, args.budget - len(results), len(unplayed))
+        if size <= 0:
+            break
+        predict = fit_surrogate(list(results.values()))
+        predicted = predict(unplayed)
+        order = np.argsort(-predicted, kind='stable')
+        batch = [unplayed[i] for i in order[:size - 1]]
+        rest = [w for w in unplayed if w not in batch]
+        batch.append(rnd.choice(rest))
+    return list(results.values())
+
+
+def best(results):
+    result = max(results, key=lambda result: result.wins)
+    return (f'{" ".join(map(str, result.weights))} '
+            f'{result.wins / result.games:.3f}')
+
+
+def report(results, top):
+    """
+    Print the top results by win rate with their intervals.
+    """
+    z = z_value(0.95)
+    ranked = sorted(results, key=lambda result: result.wins, reverse=True)
+    print(f'{"goal":>6} {"column":>6} {"prev":>6} {"train":>6} '
+          f'{"games":>6} {"win rate":>9}  95% interval')
+    for result in ranked[:top]:
+        low, high = wilson_interval(result.wins, result.games, z)
+        print(' '.join(f'{w:>6g}' for w in result.weights)
+              + f' {result.games:>6} {result.wins / result.games:>9.3f}  '
+                f'[{low:.3f}, {high:.3f}]')
+    return ranked
+
+
+def main():
+    gargs, rawboard = setup(_args)
+    baseline = config.Weights(*_args.baseline)
+    grid = weight_grid(_args)
+    rnd = random.Random(_args.seed)
+    pool = None
+    if _args.workers > 1:
+        pool = multiprocessing.Pool(_args.workers,
+                                    initializer=giganten.init_worker,
+                                    initargs=(gargs, rawboard, _args.seed))
+    try:
+        if _args.method == 'grid':
+            candidates = list(dict.fromkeys([baseline] + grid))
+            results = evaluate(pool, candidates, baseline, _args.games)
+        else:
+            results = model_search(pool, _args, grid, baseline, rnd)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    print(f'{len(results)} candidates, {_args.games} games each, '
+          f'{_args.nplayers} players, seed {_args.seed}, '
+          f'baseline {" ".join(map(str, baseline))}')
+    ranked = report(results, _args.top)
+    if _args.json:
+        with open(_args.json, 'w') as f:
+            json.dump({'nplayers': _args.nplayers, 'seed': _args.seed,
+                       'games': _args.games, 'method': _args.method,
+                       'baseline': baseline._asdict(),
+                       'results': [{**result.weights._asdict(),
+                                    'wins': result.wins,
+                                    'games': result.games}
+                                   for result in ranked]}, f, indent=2)
+            f.write('\n')
+
+
+def getargs():
+    parser = argparse.ArgumentParser(description='''
+        Tune the weights of the truck destination heuristic of giganten.
+        ''')
+    parser.add_argument('incsv', help='''
+    The file containing the board description.''')
+    parser.add_argument('--baseline', type=float, nargs=4,
+                        metavar=('GOAL', 'COLUMN', 'PREV_GOAL', 'TRAIN'),
+                        default=config.DEFAULT_WEIGHTS, help=f'''
+    The weights of the other players. The default is config.DEFAULT_WEIGHTS,
+    {' '.join(map(str, config.DEFAULT_WEIGHTS))}.''')
+    parser.add_argument('--batch', type=int, default=8, help='''
+    The number of candidates played in each round of --method model. The
+    default is 8.''')
+    parser.add_argument('--budget', type=int, default=40, help='''
+    The number of candidates played by --method model. The default is
+    40.''')
+    parser.add_argument('--column', type=float, nargs='+', default=[1, 2],
+                        help='''
+    The values of the weight of the columns the truck moves. The default is
+    1 2.''')
+    parser.add_argument('-g', '--games', type=int, default=200, help='''
+    The number of games played by each candidate. The default is 200.''')
+    parser.add_argument('--goal', type=float, nargs='+',
+                        default=[0, 1, 2, 3, 4], help='''
+    The values of the weight of the goal count. The default is
+    0 1 2 3 4.''')
+    parser.add_argument('--initial', type=int, default=16, help='''
+    The number of random candidates played first by --method model. The
+    default is 16.''')
+    parser.add_argument('--json', help='''
+    The file to write the results to as JSON.''')
+    parser.add_argument('--method', choices=('grid', 'model'),
+                        default='grid', help='''
+    Play every candidate of the grid, or search it with a surrogate model.
+    The default is grid.''')
+    parser.add_argument('-n', '--nplayers', type=int, default=4, help='''
+    The number of players. The default is 4.''')
+    parser.add_argument('--prevgoal', type=float, nargs='+',
+                        default=[0, 1, 2], help='''
+    The values of the weight of the goals on the path. The default is
+    0 1 2.''')
+    parser.add_argument('--searchcache', type=float, default=0, help='''
+    Passed to giganten: the megabytes of search results to cache in each
+    process. The default is 0, no cache.''')
+    parser.add_argument('--seed', type=int, default=1, help='''
+    The base seed of the games. The default is 1.''')
+    parser.add_argument('--top', type=int, default=10, help='''
+    The number of the best candidates to print. The default is 10.''')
+    parser.add_argument('--train', type=float, nargs='+', default=[0, 1, 2],
+                        help='''
+    The values of the weight of the columns the train can move. The default
+    is 0 1 2.''')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='''
+    The number of processes to play the games in. The default is 1.''')
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == '__main__':
+    assert sys.version_info >= (3, 11)
+    if len(sys.argv) == 1:
+        sys.argv.append('-h')
+    _args = getargs()
+    main()
@@ -0,0 +1,61 @@
+"""
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from src import board_cache
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def read_board(csvfile):
+    return [line.split() for line in csvfile
+            if line.split() and not line.startswith('#')]
+
+
+class TestBoardCache(unittest.TestCase):
+    longMessage = True
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csvpath = os.path.join(self.tmpdir, 'board.csv')
+        shutil.copyfile(os.path.join(DATADIR, 'testboard.csv'),
+                        self.csvpath)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def load(self, verify=False):
+        with mock.patch.object(board_cache, 'file_digest',
+                               wraps=board_cache.file_digest) as digest:
+            compiled = board_cache.load_board(self.csvpath, False,
+                                              read_board, verify)
+        return compiled, digest.call_count
+
+    def test_stat_check(self):
+        first, ndigests = self.load()
+        self.assertEqual(ndigests, 1, 'compiling')
+        compiled, ndigests = self.load()
+        self.assertEqual(ndigests, 0, 'unchanged')
+        self.assertEqual(bytes(compiled.terrain), bytes(first.terrain))
+        compiled, ndigests = self.load(verify=True)
+        self.assertEqual(ndigests, 1, 'verify')
+        # Touched but not changed: rehashed once, then the new time is used.
+        stat = os.stat(self.csvpath)
+        os.utime(self.csvpath, ns=(stat.st_atime_ns,
+                                   stat.st_mtime_ns + 10 ** 9))
+        compiled, ndigests = self.load()
+        self.assertEqual(ndigests, 1, 'touched')
+        self.assertEqual(compiled.mtime_ns, stat.st_mtime_ns + 10 ** 9)
+        compiled, ndigests = self.load()
+        self.assertEqual(ndigests, 0, 'after touched')
+        # Changed: recompiled.
+        with open(self.csvpath, 'a') as f:
+            f.write('# a comment\n')
+        compiled, ndigests = self.load()
+        self.assertEqual(ndigests, 1, 'changed')
+        self.assertEqual(compiled.size, os.stat(self.csvpath).st_size)
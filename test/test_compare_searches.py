@@ -0,0 +1,24 @@
+"""
+
+"""
+import unittest
+
+from src.board_generator import generate_board
+from src.graph import Graph
+from src import compare_searches
+from src import giganten
+
+
+class TestCompareSearches(unittest.TestCase):
+    longMessage = True
+
+    def test_bounded_searches_agree(self):
+        graph = Graph(generate_board(12, 20, seed=3), 4)
+        for node in graph.graph[::9]:
+            if node.wells and not node.derrick:
+                node.add_derrick()
+        queries = compare_searches.implementations(graph, giganten.SEARCHES)
+        roots = range(0, len(graph.graph), 7)
+        self.assertEqual(compare_searches.check_bounded(queries, roots), [])
+        _, mismatches = compare_searches.run_queries(queries, roots, 1, 10)
+        self.assertEqual(mismatches, [])
@@ -2,7 +2,6 @@
 
 """
 from collections import namedtuple
-import time
 
 
 GSite = namedtuple('GSite', 'wellnode goalnode')
@@ -14,15 +13,16 @@ def goals_on_path(goal_node):
     Return a list of goal nodes on the path to this goal node, including this
     node.
     Each list entry is a tuple containing the node with wells and the node on
-    our path to stop at in order to drill there.
+    our path to stop at in order to drill there. Sites already built on are
+    left out.
 
     """
     ret = []
+    sites = goal_node.graph.sites
     node = goal_node
     while node:
-        for adj in node.adjacent:
-            if adj.wells:
-                ret.append(GSite(adj, node))
+        for adj in sites.sites_next_to(node):
+            ret.append(GSite(adj, node))
         node = node.previous
         # If the node has wells, we're not allowed to stop there.
         while node and node.wells:
@@ -31,33 +31,6 @@ def goals_on_path(goal_node):
     return ret
 
 
-def time_dijkstra(graph, dijkstra, _args):
-    """
-    Called if the --timeit command-line option is selected.
-    @param graph:
-    @param dijkstra: function to call
-    @param _args: argparse args
-    @return: None
-    """
-    t0 = time.time()
-    for _ in range(_args.timeit):
-        graph.reset_graph()
-    t1 = time.time()
-    for _ in range(_args.timeit):
-        graph.reset_graph()
-        dijkstra(graph, graph.board[_args.row][_args.column],
-                 maxcost=_args.maxcost, verbose=_args.verbose)
-    t2 = time.time()
-    reset_time = t1 - t0
-    elapsed = t2 - t1
-    elapsed_dijkstra = elapsed - reset_time
-    ms_per_iteration = elapsed_dijkstra * 1000. / _args.timeit
-    print(f'{_args.timeit} iterations.')
-    print(f'Total elapsed: {elapsed:4.3f} seconds')
-    print(f'Total reset time: {reset_time:4.3f} seconds')
-    print(f'Time per iteration: {ms_per_iteration:6.2} MS')
-
-
 def one_dijkstra(graph, dijkstra, args, verbose):
     """
     Called if --dijkstra is selected on the command line.
@@ -77,6 +50,19 @@ def one_dijkstra(graph, dijkstra, args, verbose):
             print(type(g))
         # print(f'{goals=}')
     gsites = {g: goals_on_path(g) for g in goals}
+    if verbose >= 1:
+        root = graph.board[args.row][args.column]
+        cols = [node.col for node in visited]
+        first, last = min(cols), max(cols)
+        reached = graph.sites.open_sites(first, last)
+        nearest = graph.sites.nearest_site(root)
+        print(f'{graph.sites.count} open sites, {len(reached)} in columns '
+              f'{first} to {last}, nearest to {root.id}: '
+              f'{nearest.id if nearest else None}')
+        if verbose >= 2:
+            for site in reached:
+                print(f'    {site.id} wells: {site.wells}, goal cells: '
+                      f'{[node.id for node in graph.sites.goal_cells(site)]}')
     if verbose >= 2:
         print(f'{type(gsites)=}')
         for g in gsites:
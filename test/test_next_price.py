@@ -2,6 +2,7 @@
 
 """
 import unittest
+import numpy as np
 from src import oil_price
 dicevalues = [2, 2, 3, 3, 4, 4]
 dicecolors = [0, 1, 0, 1, 0, 1]
@@ -14,6 +15,25 @@ TESTCASES = (
 
 )
 
+PRICES = range(oil_price.minred, oil_price.maxblue + 1, 500)
+
 
 class TestNextPrice(unittest.TestCase):
     longMessage = True
+
+    def test_next_prices_match_scalar(self):
+        prices = np.repeat(np.array(PRICES), 6)
+        throws = np.tile(np.arange(6), len(PRICES))
+        for scalar, vector in ((oil_price.next_price_1, oil_price.next_prices_1),
+                               (oil_price.next_price_2, oil_price.next_prices_2)):
+            expected = [scalar(p, t) for p, t in zip(prices, throws)]
+            self.assertEqual(list(vector(prices, throws)), expected,
+                             scalar.__name__)
+
+    def test_stationary_distribution(self):
+        for rule in (oil_price.next_price_1, oil_price.next_price_2):
+            chain = oil_price.price_chain(rule)
+            pi = oil_price.stationary(chain)
+            np.testing.assert_allclose(chain.matrix.sum(axis=1), 1)
+            np.testing.assert_allclose(pi @ chain.matrix, pi, atol=1e-12)
+            self.assertAlmostEqual(pi.sum(), 1)
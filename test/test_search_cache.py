@@ -0,0 +1,50 @@
+"""
+
+"""
+from array import array
+import unittest
+
+from src.board_generator import generate_board
+from src.graph import Graph
+from src.search_cache import SearchCache, SearchResult, result_bytes
+
+
+def make_result(n):
+    return SearchResult(array('I', range(n)), array('I', range(n)),
+                        array('I', range(n)))
+
+
+class TestSearchCache(unittest.TestCase):
+    longMessage = True
+
+    def test_lru_and_cap(self):
+        size = result_bytes(make_result(10))
+        cache = SearchCache(3 * size)
+        for key in range(3):
+            cache.put(key, make_result(10))
+        self.assertIsNotNone(cache.get(0))  # 0 is now the most recent
+        cache.put(3, make_result(10))
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(sorted(cache.entries), [0, 2, 3])
+        self.assertLessEqual(cache.nbytes, cache.maxbytes)
+        self.assertEqual(cache.take_counts(), (1, 1))
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    def test_board_hash(self):
+        graph = Graph(generate_board(12, 20, seed=3), 4)
+        start = graph.board_hash
+        site = next(node for node in graph.graph if node.wells)
+        truck = graph.board[5][0]
+        truck.set_truck(object())
+        with_truck = graph.board_hash
+        self.assertNotEqual(with_truck, start)
+        site.add_derrick()
+        self.assertNotEqual(graph.board_hash, with_truck)
+        site.remove_derrick()
+        exhausted = graph.board_hash
+        self.assertNotEqual(exhausted, with_truck)
+        truck.set_truck(None)
+        truck.set_truck(object())
+        self.assertEqual(graph.board_hash, exhausted)
+        graph.reset()
+        self.assertEqual(graph.board_hash, start)
@@ -0,0 +1,35 @@
+"""
+
+"""
+import unittest
+
+from src import sequential
+
+
+class TestSequential(unittest.TestCase):
+    longMessage = True
+
+    def test_intervals(self):
+        z = sequential.z_value(0.95)
+        self.assertAlmostEqual(z, 1.959964, places=5)
+        low, high = sequential.wilson_interval(50, 100, z)
+        self.assertAlmostEqual(low, 0.4038, places=4)
+        self.assertAlmostEqual(high, 0.5962, places=4)
+        low, high = sequential.wilson_interval(0, 20, z)
+        self.assertEqual(low, 0)
+        self.assertGreater(high, 0)
+        # The differences 1, -1, 0, 0: mean 0, sample variance 2/3
+        low, high = sequential.mean_interval(0, 2, 4, z)
+        self.assertAlmostEqual(high, z * (2 / 3 / 4) ** 0.5)
+        self.assertAlmostEqual(low, -high)
+
+    def test_settled(self):
+        rates = sequential.WinRates(2, 0.95, difference=(0, 1))
+        for game in range(400):
+            rates.add([0] if game % 4 else [0, 1])
+        self.assertEqual(rates.wins, [400, 100])
+        diff, low, high = rates.difference_interval()
+        self.assertAlmostEqual(diff, 0.75)
+        self.assertTrue(rates.settled(0.05, 100))
+        self.assertFalse(rates.settled(0.01, 100))
+        self.assertFalse(rates.settled(0.05, 500))
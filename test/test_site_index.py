@@ -0,0 +1,49 @@
+"""
+
+"""
+import random
+import unittest
+
+from src.board_generator import generate_board
+from src.graph import Graph
+
+
+class TestSiteIndex(unittest.TestCase):
+    longMessage = True
+
+    def test_index_matches_board(self):
+        graph = Graph(generate_board(12, 20, seed=5), 4)
+        rnd = random.Random(2)
+        state = graph.snapshot_nodes()
+        for nchange in range(60):
+            open_sites = [node for node in graph.graph
+                          if node.wells and not node.derrick]
+            derricks = [node for node in graph.graph if node.derrick]
+            if derricks and rnd.random() < 0.3:
+                rnd.choice(derricks).remove_derrick()
+            else:
+                rnd.choice(open_sites).add_derrick()
+            if nchange == 40:
+                graph.restore_nodes(state)
+            self.check(graph, rnd, f'after change {nchange}')
+        graph.reset()
+        self.check(graph, rnd, 'after reset')
+
+    def check(self, graph, rnd, message):
+        sites = graph.sites
+        expected = sorted((node for node in graph.graph
+                           if node.wells and not node.derrick),
+                          key=lambda node: (node.col, node.row))
+        self.assertEqual(sites.open_sites(), expected, message)
+        self.assertEqual(sites.count, len(expected), message)
+        first, last = sorted(rnd.sample(range(graph.columns), 2))
+        self.assertEqual(sites.open_sites(first, last),
+                         [node for node in expected
+                          if first <= node.col <= last], message)
+        node = rnd.choice(graph.graph)
+        nearest = min(expected, key=lambda site: (
+            abs(site.row - node.row) + abs(site.col - node.col), site.index))
+        self.assertIs(sites.nearest_site(node), nearest, message)
+        for site in expected:
+            self.assertTrue(all(not cell.wells and site in cell.adjacent
+                                for cell in sites.goal_cells(site)), message)
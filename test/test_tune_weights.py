@@ -0,0 +1,68 @@
+"""
+
+"""
+import os
+import unittest
+from unittest import mock
+
+from src import tune_weights
+
+config = tune_weights.config
+giganten = tune_weights.giganten
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def start_giganten(argv):
+    args = giganten.getargs(argv)
+    giganten._args = args
+    rawboard = giganten.read_board(args.incsv)
+    args.incsv.close()
+    giganten.init_worker(args, rawboard, args.seed)
+    return args
+
+
+class TestTuneWeights(unittest.TestCase):
+    longMessage = True
+
+    def test_default_weights_match_default_game(self):
+        start_giganten([os.path.join(DATADIR, 'rawboard.csv'), '-n', '3',
+                        '-v', '0', '--seed', '5'])
+        for ngame in range(3):
+            game = giganten.new_game(ngame)
+            winners = giganten.play_game(game)
+            cash = [player.cash for player in game.players]
+            game = giganten.new_game(ngame, [config.DEFAULT_WEIGHTS] * 3)
+            self.assertEqual(giganten.play_game(game), winners, f'{ngame=}')
+            self.assertEqual([player.cash for player in game.players], cash,
+                             f'{ngame=}')
+
+    def test_candidate_seat(self):
+        args = mock.Mock(goal=[0, 1], column=[1], prevgoal=[2], train=[0, 3])
+        grid = tune_weights.weight_grid(args)
+        self.assertEqual(grid, [config.Weights(0, 1, 2, 0),
+                                config.Weights(0, 1, 2, 3),
+                                config.Weights(1, 1, 2, 0),
+                                config.Weights(1, 1, 2, 3)])
+        baseline = config.DEFAULT_WEIGHTS
+        nplayers = 3
+        games = []
+
+        def new_game(ngame, players):
+            games.append((ngame, players))
+            return ngame
+
+        # The player in seat 0 wins every game.
+        with mock.patch.object(giganten, '_nplayers', nplayers,
+                               create=True), \
+                mock.patch.object(giganten, 'new_game', new_game), \
+                mock.patch.object(giganten, 'play_game', lambda game: [0]):
+            results = tune_weights.evaluate(None, grid[:2], baseline, 7)
+        self.assertEqual(len(games), 14)
+        for ngame, players in games:
+            seat = ngame % nplayers
+            self.assertIn(players[seat], grid[:2], f'{ngame=}')
+            self.assertEqual(players[:seat] + players[seat + 1:],
+                             [baseline] * (nplayers - 1), f'{ngame=}')
+        # Seat 0 in games 0, 3 and 6.
+        self.assertEqual(results, [tune_weights.Result(grid[0], 3, 7),
+                                   tune_weights.Result(grid[1], 3, 7)])